@@ -1,11 +1,14 @@
-import sqlite3
-
-from PyQt5.QtWidgets import QDialog, QGridLayout, QLabel, QLineEdit, QPushButton, QHBoxLayout, QMessageBox
+from PyQt5.QtCore import Qt, QStringListModel
+from PyQt5.QtWidgets import QDialog, QGridLayout, QLabel, QLineEdit, QPushButton, QHBoxLayout, QMessageBox, \
+    QCompleter
 from datetime import datetime
 
+from TaskRunner import get_task_runner
+from data_access import get_repository
+
 
 class AddEditRecordDialog(QDialog):
-    def __init__(self, parent, record=None):
+    def __init__(self, parent, record=None, template=None):
         super().__init__(parent)
         self.setWindowTitle("Add/Edit Record")
         self.layout = QGridLayout(self)
@@ -60,11 +63,43 @@ class AddEditRecordDialog(QDialog):
 
         self.layout.addLayout(button_layout, 6, 0, 1, 3)  # Span across three columns
 
+        # Autocomplete from the values already used, so the same racket or string isn't spelled two ways.
+        # The lists are read on a worker thread the first time; after that they are served from memory.
+        self.completers = {}
+        for field, column in [(self.racket, "racket"), (self.string, "string"), (self.who_strung, "who_strung")]:
+            completer = QCompleter(self)
+            completer.setCaseSensitivity(Qt.CaseInsensitive)
+            completer.setFilterMode(Qt.MatchContains)
+            field.setCompleter(completer)
+            self.completers[column] = completer
+        columns = list(self.completers)
+        if all(get_repository().lookups.is_loaded(column) for column in columns):
+            self.show_lookup_values(self._lookup_values(columns))
+        else:
+            get_task_runner().submit("lookup-values", self._lookup_values, columns, on_done=self.show_lookup_values)
+
         # Store the record being edited
         self.record = record
 
         if self.record:
             self.populate_fields()
+        elif template:
+            # A restring: the customer's last racket, string and tension, strung today
+            for field in ["name", "racket", "string", "tension"]:
+                getattr(self, field).setText(template[field])
+            self.set_current_date()
+            self.who_strung.setFocus()
+
+    @staticmethod
+    def _lookup_values(columns):
+        """Return {column: autocomplete values}, reading any not yet in the lookup cache (worker thread)."""
+        repository = get_repository()
+        return {column: repository.lookup_values(column) for column in columns}
+
+    def show_lookup_values(self, values):
+        for column, column_values in values.items():
+            completer = self.completers[column]
+            completer.setModel(QStringListModel(column_values, completer))
 
     def populate_fields(self):
         self.name.setText(self.record['name'])
@@ -94,27 +129,34 @@ class AddEditRecordDialog(QDialog):
             QMessageBox.critical(self, "Invalid Date", "Please enter a valid date in MM/DD/YYYY format.")
             return
 
-        conn = sqlite3.connect("stringing.db")
-        cursor = conn.cursor()
-        if self.record:
-            cursor.execute("""
-            UPDATE StringingRecords
-            SET name = ?, racket = ?, string = ?, tension = ?, date_strung = ?, who_strung = ?
-            WHERE id = ?
-            """, (self.name.text(), self.racket.text(), self.string.text(),
-                  self.tension.text(), date_strung, self.who_strung.text(), self.record['id']))
+        fields = (self.name.text(), self.racket.text(), self.string.text(), self.tension.text(), date_strung,
+                  self.who_strung.text())
+        record_id = self.record['id'] if self.record else None
+        search = self.parent().model.current_search()
+        # Write in the background; the dialog stays responsive but can't be saved twice
+        self.save_button.setEnabled(False)
+        get_task_runner().submit("save-record", self._write_record, record_id, fields, search,
+                                 on_done=self.record_saved, on_error=self.save_failed)
+
+    @staticmethod
+    def _write_record(record_id, fields, search):
+        """Insert or update the record, then read back the row the table should show (worker thread)."""
+        repository = get_repository()
+        if record_id is None:
+            record_id = repository.insert_record(*fields)
         else:
-            cursor.execute("""
-            INSERT INTO StringingRecords (name, racket, string, tension, date_strung, who_strung)
-            VALUES (?, ?, ?, ?, ?, ?)""",
-                           (self.name.text(), self.racket.text(), self.string.text(),
-                            self.tension.text(), date_strung, self.who_strung.text()))
-        conn.commit()
-        conn.close()
+            repository.update_record(record_id, *fields)
+        return record_id, repository.fetch_record(record_id, search), search
+
+    def record_saved(self, result):
         QMessageBox.information(self, "Success", "Record saved successfully!")
-        self.parent().load_records()
+        self.parent().model.apply_saved_record(*result)
         self.close()
 
+    def save_failed(self, error):
+        QMessageBox.critical(self, "Error", f"Failed to save record: {error}")
+        self.check_fields()
+
     def check_fields(self):
         """Enable or disable the Save button based on field values."""
         if (self.name.text().strip() and self.racket.text().strip() and self.string.text().strip() and
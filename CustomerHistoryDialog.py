@@ -0,0 +1,82 @@
+from datetime import datetime
+
+from PyQt5.QtWidgets import QGridLayout, QLabel, QPushButton, QTableWidget, QTableWidgetItem, QDialog, QMessageBox, \
+    QHeaderView, QAbstractItemView
+
+from AddEditRecordDialog import AddEditRecordDialog
+from RecordsTableModel import RECORD_FIELDS, DATE_COLUMN
+from TaskRunner import get_task_runner
+from data_access import get_repository
+
+HISTORY_COLUMNS = [("Date", DATE_COLUMN), ("Racket", 2), ("String", 3), ("Tension", 4), ("Who Strung", 6)]
+
+
+class CustomerHistoryDialog(QDialog):
+    """A customer's records, newest first, with a shortcut to restring the way they had it last time."""
+
+    def __init__(self, parent, name):
+        super().__init__(parent)
+        self.name = name
+        self.history = []
+        self.setWindowTitle(f"Customer History - {name}")
+        self.resize(700, 400)
+        self.setLayout(QGridLayout())
+
+        self.summary = QLabel("Loading...")
+        self.layout().addWidget(self.summary, 0, 0)
+
+        self.restring_button = QPushButton("Restring Same as Last Time")
+        self.restring_button.clicked.connect(self.restring)
+        self.restring_button.setEnabled(False)
+        self.layout().addWidget(self.restring_button, 0, 1)
+
+        self.history_table = QTableWidget()
+        self.history_table.setColumnCount(len(HISTORY_COLUMNS))
+        self.history_table.setHorizontalHeaderLabels([header for header, _ in HISTORY_COLUMNS])
+        self.history_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.history_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.history_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.layout().addWidget(self.history_table, 1, 0, 1, 2)
+
+        self.load_history()
+
+    def load_history(self):
+        repository = get_repository()
+        history = repository.recent_customer(self.name)
+        if history is not None:
+            self.show_history(history)  # Looked up earlier today; no query needed
+            return
+        get_task_runner().submit("customer-history", repository.customer_history, self.name,
+                                 on_done=self.show_history, on_error=self.history_failed)
+
+    def show_history(self, history):
+        self.history = history
+        self.history_table.setRowCount(len(history))
+        for row_index, record in enumerate(history):
+            for column_index, (_, field) in enumerate(HISTORY_COLUMNS):
+                value = self.format_date(record[field]) if field == DATE_COLUMN else str(record[field])
+                self.history_table.setItem(row_index, column_index, QTableWidgetItem(value))
+        if history:
+            self.summary.setText(f"{len(history)} record(s), last strung {self.format_date(history[0][DATE_COLUMN])}")
+        else:
+            self.summary.setText("No records for this customer.")
+        self.restring_button.setEnabled(bool(history))
+
+    @staticmethod
+    def format_date(date_strung):
+        # Convert YYYY-MM-DD to MM/DD/YYYY
+        try:
+            return datetime.strptime(date_strung, "%Y-%m-%d").strftime("%m/%d/%Y")
+        except (TypeError, ValueError):
+            return str(date_strung)
+
+    def history_failed(self, error):
+        self.summary.setText("")
+        QMessageBox.critical(self, "Error", f"Failed to load customer history: {error}")
+
+    def restring(self):
+        last = dict(zip(RECORD_FIELDS, self.history[0]))
+        # The main window owns the records table the new record is added to
+        dialog = AddEditRecordDialog(self.parent(), template=last)
+        dialog.exec_()
+        self.load_history()
@@ -0,0 +1,65 @@
+from PyQt5.QtCore import QDate
+from PyQt5.QtWidgets import QDialog, QGridLayout, QRadioButton, QDateEdit, QLabel, QPushButton, QHBoxLayout
+
+
+class ExportDialog(QDialog):
+    """Asks which records to export: all of them, the current search result, or a date range."""
+
+    def __init__(self, parent=None, search=""):
+        super().__init__(parent)
+        self.setWindowTitle("Export Records")
+        self.layout = QGridLayout(self)
+        self.search = search
+
+        self.all_records = QRadioButton("All records")
+        self.all_records.setChecked(True)
+        self.layout.addWidget(self.all_records, 0, 0, 1, 2)
+
+        self.search_results = QRadioButton(f"Current search results (\"{search}\")")
+        self.search_results.setEnabled(bool(search.strip()))
+        self.layout.addWidget(self.search_results, 1, 0, 1, 2)
+
+        self.date_range = QRadioButton("Records strung between:")
+        self.date_range.toggled.connect(self.update_date_fields)
+        self.layout.addWidget(self.date_range, 2, 0, 1, 2)
+
+        # Input fields for date range
+        self.layout.addWidget(QLabel("Start Date:"), 3, 0)
+        self.start_date = QDateEdit()
+        self.start_date.setCalendarPopup(True)  # Enable calendar popup for date selection
+        self.start_date.setDisplayFormat("MM/dd/yyyy")
+        self.start_date.setDate(QDate.currentDate().addMonths(-1))
+        self.layout.addWidget(self.start_date, 3, 1)
+
+        self.layout.addWidget(QLabel("End Date:"), 4, 0)
+        self.end_date = QDateEdit()
+        self.end_date.setCalendarPopup(True)  # Enable calendar popup for date selection
+        self.end_date.setDisplayFormat("MM/dd/yyyy")
+        self.end_date.setDate(QDate.currentDate())  # Set default date to today
+        self.layout.addWidget(self.end_date, 4, 1)
+
+        self.export_button = QPushButton("Export")
+        self.export_button.setDefault(True)
+        self.export_button.clicked.connect(self.accept)
+        cancel_button = QPushButton("Cancel")
+        cancel_button.clicked.connect(self.reject)
+
+        button_layout = QHBoxLayout()
+        button_layout.addStretch()
+        button_layout.addWidget(self.export_button)
+        button_layout.addWidget(cancel_button)
+        self.layout.addLayout(button_layout, 5, 0, 1, 2)
+
+        self.update_date_fields()
+
+    def update_date_fields(self):
+        self.start_date.setEnabled(self.date_range.isChecked())
+        self.end_date.setEnabled(self.date_range.isChecked())
+
+    def export_filter(self):
+        """Return the (search, start_date, end_date) arguments for export_utils.export_file."""
+        if self.search_results.isChecked():
+            return self.search, None, None
+        if self.date_range.isChecked():
+            return None, self.start_date.date().toString("yyyy-MM-dd"), self.end_date.date().toString("yyyy-MM-dd")
+        return None, None, None
@@ -0,0 +1,33 @@
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from data_access import get_repository
+from export_utils import export_file, ExportCancelled
+
+
+class ExportWorker(QThread):
+    """Runs export_utils.export_file off the GUI thread, reporting progress through signals."""
+
+    progress = pyqtSignal(int)
+    finished_export = pyqtSignal(int)  # Number of records written
+    cancelled = pyqtSignal()
+    failed = pyqtSignal(object)  # The exception that stopped the export
+
+    def __init__(self, file_path, search=None, start_date=None, end_date=None, parent=None):
+        super().__init__(parent)
+        self.file_path = file_path
+        self.search = search
+        self.start_date = start_date
+        self.end_date = end_date
+
+    def run(self):
+        try:
+            written = export_file(self.file_path, self.search, self.start_date, self.end_date,
+                                  progress=self.progress.emit, is_cancelled=self.isInterruptionRequested)
+        except ExportCancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            self.failed.emit(e)
+        else:
+            self.finished_export.emit(written)
+        finally:
+            get_repository().release_connection()
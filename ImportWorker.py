@@ -0,0 +1,30 @@
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from data_access import get_repository
+from import_utils import import_file, ImportCancelled
+
+
+class ImportWorker(QThread):
+    """Runs import_utils.import_file off the GUI thread, reporting progress through signals."""
+
+    progress = pyqtSignal(int)
+    finished_import = pyqtSignal(object)  # ImportResult
+    cancelled = pyqtSignal()
+    failed = pyqtSignal(object)  # The exception that stopped the import
+
+    def __init__(self, file_path, parent=None):
+        super().__init__(parent)
+        self.file_path = file_path
+
+    def run(self):
+        try:
+            result = import_file(self.file_path, progress=self.progress.emit,
+                                 is_cancelled=self.isInterruptionRequested)
+        except ImportCancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            self.failed.emit(e)
+        else:
+            self.finished_import.emit(result)
+        finally:
+            get_repository().release_connection()
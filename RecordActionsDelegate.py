@@ -0,0 +1,57 @@
+from PyQt5.QtCore import Qt, QEvent, QRect, pyqtSignal
+from PyQt5.QtWidgets import QStyledItemDelegate, QStyleOptionButton, QStyle, QApplication
+
+BUTTON_LABELS = ["Edit", "Delete"]
+BUTTON_MARGIN = 5  # Padding around buttons
+BUTTON_SPACING = 10  # Space between buttons
+
+
+class RecordActionsDelegate(QStyledItemDelegate):
+    """Paints the Edit/Delete buttons of the Actions column instead of creating widgets per row."""
+
+    edit_requested = pyqtSignal(int)
+    delete_requested = pyqtSignal(int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._pressed = None  # (row, button index) currently held down
+
+    def paint(self, painter, option, index):
+        style = option.widget.style() if option.widget else QApplication.style()
+        for button_index, button_rect in enumerate(self._button_rects(option.rect)):
+            button = QStyleOptionButton()
+            button.rect = button_rect
+            button.text = BUTTON_LABELS[button_index]
+            button.state = QStyle.State_Enabled
+            if self._pressed == (index.row(), button_index):
+                button.state |= QStyle.State_Sunken
+            else:
+                button.state |= QStyle.State_Raised
+            style.drawControl(QStyle.CE_PushButton, button, painter, option.widget)
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() not in (QEvent.MouseButtonPress, QEvent.MouseButtonRelease) or \
+                event.button() != Qt.LeftButton:
+            return False
+        hit = None
+        for button_index, button_rect in enumerate(self._button_rects(option.rect)):
+            if button_rect.contains(event.pos()):
+                hit = (index.row(), button_index)
+        if event.type() == QEvent.MouseButtonPress:
+            self._pressed = hit
+            return hit is not None
+        pressed, self._pressed = self._pressed, None
+        if hit is None or hit != pressed:
+            return pressed is not None
+        if hit[1] == 0:
+            self.edit_requested.emit(index.row())
+        else:
+            self.delete_requested.emit(index.row())
+        return True
+
+    @staticmethod
+    def _button_rects(cell_rect):
+        inner = cell_rect.adjusted(BUTTON_MARGIN, BUTTON_MARGIN, -BUTTON_MARGIN, -BUTTON_MARGIN)
+        width = max(0, (inner.width() - BUTTON_SPACING) // len(BUTTON_LABELS))
+        return [QRect(inner.left() + i * (width + BUTTON_SPACING), inner.top(), width, inner.height())
+                for i in range(len(BUTTON_LABELS))]
@@ -0,0 +1,221 @@
+import time
+from datetime import datetime
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, pyqtSignal
+
+import profiler
+import startup_trace
+from TaskRunner import get_task_runner
+from data_access import get_repository
+
+COLUMN_HEADERS = ["ID", "Name", "Racket", "String", "Tension", "Date", "Who Strung", "Actions"]
+RECORD_FIELDS = ["id", "name", "racket", "string", "tension", "date_strung", "who_strung"]
+DATE_COLUMN = 5
+ACTIONS_COLUMN = 7
+SORT_DATE_COLUMN = 7  # In the rows (not the view): date_strung, None when the date couldn't be read
+PAGE_SIZE = 200  # Rows pulled from the database per fetchMore() call
+
+
+class RecordsTableModel(QAbstractTableModel):
+    """Table model that pages StringingRecords in on demand instead of loading every row.
+
+    Pages are queried on the TaskRunner's worker threads and inserted when they arrive. Each page
+    continues after the last row loaded (keyset paging), so it costs the same however far down it is;
+    a search matching few records sorts all of them for each page, which stays cheap because there are few.
+    """
+
+    load_failed = pyqtSignal(object)  # The exception raised while fetching a page
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = []  # Raw database rows, in display order
+        self._dates = []  # Pre-formatted MM/DD/YYYY strings, one per row
+        self._search = ""
+        self._exhausted = False
+        self._loading = False  # A page query is in flight
+        self._page_stale = False  # Rows changed while the page was in flight; it is re-requested
+        self._requested_at = 0.0  # perf_counter() when the in-flight page was requested
+        self._generation = 0  # Bumped on every refresh so pages from a superseded query are dropped
+        self._first_page_shown = False
+
+    def refresh(self, search=""):
+        """Drop everything loaded so far and start paging again from the first row."""
+        self.beginResetModel()
+        self._generation += 1
+        self._search = search
+        self._rows = []
+        self._dates = []
+        self._exhausted = False
+        self._loading = False  # Any page still in flight belongs to the old search
+        self._page_stale = False
+        self.endResetModel()
+        if self.canFetchMore(QModelIndex()):
+            self.fetchMore(QModelIndex())
+
+    def is_loading(self):
+        """Return whether a page query is still in flight."""
+        return self._loading
+
+    def current_search(self):
+        return self._search
+
+    def record(self, row):
+        """Return the record shown at `row` as a dict, in the shape AddEditRecordDialog expects."""
+        return dict(zip(RECORD_FIELDS, self._rows[row]))
+
+    def apply_saved_record(self, record_id, record, search):
+        """Show an added or edited record in place, without reloading the table.
+
+        `record` is the row as fetch_record returned it for `search`, or None if the search excludes it.
+        The row is inserted, updated, moved or removed so the loaded rows keep the database's order;
+        selection and scroll position are left alone.
+        """
+        if search != self._search:
+            self.refresh(self._search)  # Filtered for another search
+            return
+        # A page in flight may have been read before this change
+        self._page_stale = self._loading
+        old = self._find(record_id)
+        if record is None:
+            if old is not None:
+                self._remove(old)
+            return
+        rows = self._rows[:old] + self._rows[old + 1:] if old is not None else self._rows
+        target = self._position(rows, record)
+        if target == len(rows) and not self._exhausted:
+            # Sorts after the last row loaded, so the next page (which starts there) brings it in
+            if old is not None:
+                self._remove(old)
+            return
+        if old is None:
+            self.beginInsertRows(QModelIndex(), target, target)
+            self._rows.insert(target, record)
+            self._dates.insert(target, self._format_date(record[DATE_COLUMN]))
+            self.endInsertRows()
+            return
+        if target != old:
+            # Destination is given in the row numbers from before the move
+            self.beginMoveRows(QModelIndex(), old, old, QModelIndex(), target if target < old else target + 1)
+            self._rows.insert(target, self._rows.pop(old))
+            self._dates.insert(target, self._dates.pop(old))
+            self.endMoveRows()
+        self._rows[target] = record
+        self._dates[target] = self._format_date(record[DATE_COLUMN])
+        self.dataChanged.emit(self.index(target, 0), self.index(target, len(COLUMN_HEADERS) - 1))
+
+    def remove_record(self, record_id):
+        """Drop a deleted record from the loaded rows, if it is among them."""
+        self._page_stale = self._loading
+        row = self._find(record_id)
+        if row is not None:
+            self._remove(row)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMN_HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        column = index.column()
+        if column == ACTIONS_COLUMN:
+            return None  # Drawn by RecordActionsDelegate
+        if column == DATE_COLUMN:
+            return self._dates[index.row()]
+        return str(self._rows[index.row()][column])
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return COLUMN_HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def canFetchMore(self, parent):
+        return not parent.isValid() and not self._exhausted and not self._loading
+
+    def fetchMore(self, parent):
+        if not self.canFetchMore(parent):
+            return
+        self._loading = True
+        self._requested_at = time.perf_counter()
+        generation = self._generation
+        # Submitting under the same key supersedes (and interrupts) a page query for an older search
+        last = self._rows[-1] if self._rows else None
+        after = (last[SORT_DATE_COLUMN], last[0]) if last else None
+        get_task_runner().submit("records-page", get_repository().fetch_page, self._search, PAGE_SIZE,
+                                 after, interruptible=True,
+                                 on_done=lambda page: self._page_loaded(generation, page),
+                                 on_error=lambda error: self._page_failed(generation, error))
+
+    def _page_loaded(self, generation, page):
+        if generation != self._generation:
+            return  # A newer search replaced this one while the page was loading
+        self._loading = False
+        if self._page_stale:
+            # Queried before a record was saved or deleted; ask again from the current last row
+            self._page_stale = False
+            self.fetchMore(QModelIndex())
+            return
+        if len(page) < PAGE_SIZE:
+            self._exhausted = True
+        if page:
+            with profiler.timed("ui: insert page rows") as timing:
+                first = len(self._rows)
+                self.beginInsertRows(QModelIndex(), first, first + len(page) - 1)
+                self._rows.extend(page)
+                self._dates.extend(self._format_date(row[DATE_COLUMN]) for row in page)
+                self.endInsertRows()
+                timing.rows = len(page)
+        # From the request to the rows being in the view, including time spent queued on the pool
+        profiler.record("ui: records page", (time.perf_counter() - self._requested_at) * 1000, len(page))
+        if not self._first_page_shown:
+            self._first_page_shown = True
+            startup_trace.mark("first records page shown")
+
+    def _page_failed(self, generation, error):
+        if generation != self._generation:
+            return
+        self._loading = False
+        self._page_stale = False
+        self._exhausted = True  # Stop the view from retrying until the next refresh
+        self.load_failed.emit(error)
+
+    def _find(self, record_id):
+        for row, values in enumerate(self._rows):
+            if values[0] == record_id:
+                return row
+        return None
+
+    def _remove(self, row):
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._rows[row]
+        del self._dates[row]
+        self.endRemoveRows()
+
+    @staticmethod
+    def _sort_key(record):
+        # Mirrors PAGE_ORDER: date_strung DESC, id DESC, with unparsed (NULL) dates last
+        date_strung = record[SORT_DATE_COLUMN]
+        return date_strung is not None, date_strung or "", record[0]
+
+    @classmethod
+    def _position(cls, rows, record):
+        """Binary search for where `record` belongs in `rows`, which are sorted newest first."""
+        key = cls._sort_key(record)
+        low, high = 0, len(rows)
+        while low < high:
+            middle = (low + high) // 2
+            if cls._sort_key(rows[middle]) > key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    @staticmethod
+    def _format_date(date_strung):
+        # Convert date column from YYYY-MM-DD to MM/DD/YYYY
+        try:
+            return datetime.strptime(date_strung, "%Y-%m-%d").strftime("%m/%d/%Y")
+        except (TypeError, ValueError):
+            return str(date_strung)
@@ -1,7 +1,10 @@
-import sqlite3
-
 from PyQt5.QtCore import QDate
-from PyQt5.QtWidgets import QGridLayout, QLabel, QDateEdit, QPushButton, QTableWidget, QTableWidgetItem, QDialog
+from PyQt5.QtWidgets import QGridLayout, QLabel, QDateEdit, QPushButton, QTableWidget, QTableWidgetItem, QDialog, \
+    QComboBox, QMessageBox
+
+from TaskRunner import get_task_runner
+from profiler import timed
+from data_access import get_repository, REPORT_COLUMNS, REPORT_DIMENSIONS
 
 
 class ReportDialog(QDialog):
@@ -25,38 +28,53 @@ class ReportDialog(QDialog):
         self.end_date.setDate(QDate.currentDate())  # Set default date to today
         self.layout().addWidget(self.end_date, 1, 1)
 
+        # What to count rackets by
+        self.layout().addWidget(QLabel("Group By:"), 2, 0)
+        self.dimension = QComboBox()
+        self.dimension.addItems(REPORT_DIMENSIONS)
+        self.layout().addWidget(self.dimension, 2, 1)
+
         # Generate button
         self.generate_button = QPushButton("Generate")
         self.generate_button.clicked.connect(self.generate_report)
-        self.layout().addWidget(self.generate_button, 2, 0, 1, 2)
+        self.layout().addWidget(self.generate_button, 3, 0, 1, 2)
 
         # Result table
         self.result_table = QTableWidget()
-        self.result_table.setColumnCount(2)
-        self.result_table.setHorizontalHeaderLabels(["Who Strung", "Rackets Count"])
-        self.layout().addWidget(self.result_table, 3, 0, 1, 2)
+        self.result_table.setColumnCount(1 + len(REPORT_COLUMNS))
+        self.result_table.setHorizontalHeaderLabels(["Who Strung", *REPORT_COLUMNS])
+        self.layout().addWidget(self.result_table, 4, 0, 1, 2)
 
     def generate_report(self):
         # Retrieve selected dates
         start_date = self.start_date.date().toString("yyyy-MM-dd")
         end_date = self.end_date.date().toString("yyyy-MM-dd")
 
-        # Query the database
-        conn = sqlite3.connect("stringing.db")
-        cursor = conn.cursor()
-        query = """
-            SELECT who_strung, COUNT(*) AS rackets_count
-            FROM StringingRecords
-            WHERE date(date_strung) BETWEEN ? AND ?
-            GROUP BY who_strung
-            ORDER BY rackets_count DESC
-        """
-        cursor.execute(query, (start_date, end_date))
-        results = cursor.fetchall()
-        conn.close()
+        dimension = self.dimension.currentText()
+
+        # Query the database in the background
+        self.generate_button.setEnabled(False)
+        get_task_runner().submit("report", get_repository().report, dimension, start_date, end_date,
+                                 interruptible=True,
+                                 on_done=lambda results: self.show_report(dimension, results),
+                                 on_error=self.report_failed)
+
+    def show_report(self, dimension, results):
+        self.generate_button.setEnabled(True)
 
         # Display results in the table
-        self.result_table.setRowCount(len(results))
-        for row_index, (who_strung, count) in enumerate(results):
-            self.result_table.setItem(row_index, 0, QTableWidgetItem(str(who_strung)))
-            self.result_table.setItem(row_index, 1, QTableWidgetItem(str(count)))
+        with timed("ui: fill report table") as timing:
+            self.result_table.setHorizontalHeaderLabels([dimension, *REPORT_COLUMNS])
+            self.result_table.setRowCount(len(results))
+            for row_index, (value, count, average, deviation) in enumerate(results):
+                self.result_table.setItem(row_index, 0, QTableWidgetItem(str(value)))
+                self.result_table.setItem(row_index, 1, QTableWidgetItem(str(count)))
+                # Blank when none of the records has a readable tension
+                for column, statistic in [(2, average), (3, deviation)]:
+                    self.result_table.setItem(row_index, column,
+                                              QTableWidgetItem("" if statistic is None else f"{statistic:.1f}"))
+            timing.rows = len(results)
+
+    def report_failed(self, error):
+        self.generate_button.setEnabled(True)
+        QMessageBox.critical(self, "Error", f"Failed to generate report: {error}")
@@ -0,0 +1,126 @@
+import threading
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from data_access import get_repository
+
+
+class _TaskSignals(QObject):
+    done = pyqtSignal(object, object)  # task, result
+    failed = pyqtSignal(object, object)  # task, exception
+
+
+class _Task(QRunnable):
+    def __init__(self, key, generation, function, args, on_done, on_error, interruptible):
+        super().__init__()
+        self.key = key
+        self.generation = generation
+        self.function = function
+        self.args = args
+        self.on_done = on_done
+        self.on_error = on_error
+        self.interruptible = interruptible
+        self.signals = _TaskSignals()
+        self._connection = None  # This worker thread's database connection while the task runs
+        self._lock = threading.Lock()
+        self.setAutoDelete(False)  # TaskRunner holds the task until its result is delivered
+
+    def run(self):
+        with self._lock:
+            self._connection = get_repository().connection
+        try:
+            result = self.function(*self.args)
+        except Exception as e:
+            self.signals.failed.emit(self, e)
+        else:
+            self.signals.done.emit(self, result)
+        finally:
+            with self._lock:
+                self._connection = None
+            # Pool threads are retired when idle; don't leave their connections open
+            get_repository().release_connection()
+
+    def interrupt(self):
+        """Abort the query this task is running, if it is still running one."""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.interrupt()
+
+
+class TaskRunner(QObject):
+    """Runs database work on a QThreadPool and delivers results back on the GUI thread.
+
+    Tasks are submitted under a key. Submitting again under the same key supersedes the earlier
+    task: its result is dropped, and if it was submitted as interruptible its query is aborted.
+    """
+
+    busy_changed = pyqtSignal(bool)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._pool = QThreadPool.globalInstance()
+        self._generations = {}
+        self._latest = {}  # key -> most recently submitted task
+        self._tasks = set()  # Keeps tasks alive until their result has been delivered
+        self._busy = 0
+
+    def submit(self, key, function, *args, on_done=None, on_error=None, interruptible=False):
+        """Run `function(*args)` on a worker thread, then call `on_done(result)` or `on_error(exception)`."""
+        generation = self._generations.get(key, 0) + 1
+        self._generations[key] = generation
+        previous = self._latest.get(key)
+        if previous is not None and previous.interruptible:
+            previous.interrupt()
+
+        task = _Task(key, generation, function, args, on_done, on_error, interruptible)
+        task.signals.done.connect(self._task_done)
+        task.signals.failed.connect(self._task_failed)
+        self._latest[key] = task
+        self._tasks.add(task)
+        self.begin_busy()
+        self._pool.start(task)
+        return generation
+
+    def is_current(self, key, generation):
+        return self._generations.get(key) == generation
+
+    def begin_busy(self):
+        """Mark the start of background work; the busy indicator shows until the matching end_busy()."""
+        self._busy += 1
+        if self._busy == 1:
+            self.busy_changed.emit(True)
+
+    def end_busy(self):
+        self._busy -= 1
+        if self._busy == 0:
+            self.busy_changed.emit(False)
+
+    def _task_done(self, task, result):
+        if self._finish(task) and task.on_done:
+            task.on_done(result)
+
+    def _task_failed(self, task, error):
+        if self._finish(task):
+            if task.on_error:
+                task.on_error(error)
+            else:
+                print(f"Background task '{task.key}' failed: {error}")
+
+    def _finish(self, task):
+        """Release the task and return whether its result is still wanted."""
+        self._tasks.discard(task)
+        if self._latest.get(task.key) is task:
+            del self._latest[task.key]
+        self.end_busy()
+        return self.is_current(task.key, task.generation)
+
+
+_task_runner = None
+
+
+def get_task_runner():
+    """Return the application's TaskRunner, creating it on first use (after QApplication exists)."""
+    global _task_runner
+    if _task_runner is None:
+        _task_runner = TaskRunner()
+    return _task_runner
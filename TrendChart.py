@@ -0,0 +1,165 @@
+import math
+
+from PyQt5.QtCore import Qt, QPointF, QRectF
+from PyQt5.QtGui import QColor, QPainter, QPen, QPolygonF, QFontMetrics
+from PyQt5.QtWidgets import QWidget, QSizePolicy
+
+from profiler import timed
+
+SERIES_COLORS = ["#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd", "#8c564b", "#7f7f7f"]
+MARGIN_LEFT = 60  # Room for the y axis labels
+MARGIN_RIGHT = 20
+MARGIN_TOP = 8  # Above the title; the legend rows below it add to the plot's top margin
+MARGIN_BOTTOM = 36  # x axis labels
+Y_TICKS = 5
+X_LABEL_SPACING = 90  # Minimum pixels between x axis labels
+LEGEND_NAME_WIDTH = 140  # Longer series names are elided
+
+
+class TrendChart(QWidget):
+    """Line chart of an analytics_utils.Chart, painted directly; redraws never touch the database."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.chart = None
+        self.message = "Loading..."
+        self.setMinimumSize(400, 250)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+
+    def set_chart(self, chart):
+        self.chart = chart
+        self.message = None if chart is not None and chart.records else "No records in this date range."
+        self.update()
+
+    def set_message(self, message):
+        self.chart = None
+        self.message = message
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.fillRect(self.rect(), self.palette().base())
+        if self.message or self.chart is None:
+            painter.drawText(self.rect(), Qt.AlignCenter, self.message or "")
+            return
+        with timed("ui: draw trend chart") as timing:
+            legend = self._legend_rows()
+            top = MARGIN_TOP + QFontMetrics(self.font()).height() * (len(legend) + 1) + 8
+            plot = QRectF(self.rect()).adjusted(MARGIN_LEFT, top, -MARGIN_RIGHT, -MARGIN_BOTTOM)
+            x_values = [float(value) for value in self.chart.x]
+            low, high = self._y_range()
+            x_low, x_high = x_values[0], x_values[-1]
+
+            def to_point(x, y):
+                x_fraction = (x - x_low) / (x_high - x_low) if x_high > x_low else 0.5
+                return QPointF(plot.left() + x_fraction * plot.width(),
+                               plot.bottom() - (y - low) / (high - low) * plot.height())
+
+            self._draw_axes(painter, plot, low, high, x_low, x_high)
+            points = 0
+            for index, (name, values) in enumerate(self.chart.series):
+                painter.setPen(QPen(QColor(SERIES_COLORS[index % len(SERIES_COLORS)]), 2))
+                # NaN (no records in that period) breaks the line
+                line = QPolygonF()
+                for x, y in zip(x_values, values):
+                    if math.isnan(y):
+                        if line.size() > 1:
+                            painter.drawPolyline(line)
+                        line = QPolygonF()
+                        continue
+                    line.append(to_point(x, float(y)))
+                    points += 1
+                if line.size() == 1:
+                    painter.drawEllipse(line.at(0), 2, 2)
+                elif line.size() > 1:
+                    painter.drawPolyline(line)
+            self._draw_legend(painter, legend)
+            timing.rows = points
+
+    def _y_range(self):
+        values = [float(value) for _, series in self.chart.series for value in series if not math.isnan(value)]
+        low = 0.0 if self.chart.y_from_zero or not values else min(values)
+        high = max(values) if values else 1.0
+        if high <= low:
+            high = low + 1.0
+        if not self.chart.y_from_zero:
+            # Keep lines off the axis
+            padding = (high - low) * 0.1
+            low, high = low - padding, high + padding
+        # Round the top up to a whole number of tick steps
+        step = _nice_step((high - low) / Y_TICKS)
+        return math.floor(low / step) * step, math.ceil(high / step) * step
+
+    def _draw_axes(self, painter, plot, low, high, x_low, x_high):
+        metrics = QFontMetrics(self.font())
+        grid_pen = QPen(self.palette().mid().color(), 1, Qt.DotLine)
+        text_pen = QPen(self.palette().text().color())
+        step = _nice_step((high - low) / Y_TICKS)
+        for index in range(round((high - low) / step) + 1):
+            tick = low + index * step
+            y = plot.bottom() - (tick - low) / (high - low) * plot.height()
+            painter.setPen(grid_pen)
+            painter.drawLine(QPointF(plot.left(), y), QPointF(plot.right(), y))
+            painter.setPen(text_pen)
+            painter.drawText(QRectF(0, y - 10, MARGIN_LEFT - 6, 20), Qt.AlignRight | Qt.AlignVCenter,
+                             f"{round(tick, 6):g}")
+        painter.drawLine(plot.bottomLeft(), plot.bottomRight())
+        painter.drawLine(plot.bottomLeft(), plot.topLeft())
+
+        spacing = max(X_LABEL_SPACING, metrics.horizontalAdvance(self.chart.label(x_high)) + 16)
+        labels = max(1, min(int(plot.width() // spacing), int(x_high - x_low) + 1))
+        for index in range(labels):
+            fraction = index / (labels - 1) if labels > 1 else 0.5
+            value = round(x_low + fraction * (x_high - x_low))
+            x = plot.left() + ((value - x_low) / (x_high - x_low) if x_high > x_low else 0.5) * plot.width()
+            painter.drawLine(QPointF(x, plot.bottom()), QPointF(x, plot.bottom() + 4))
+            # Centered under the tick, but kept inside the widget at either end
+            left = min(max(x - spacing / 2, 0), self.width() - spacing)
+            painter.drawText(QRectF(left, plot.bottom() + 6, spacing, metrics.height()),
+                             Qt.AlignHCenter | Qt.AlignTop, self.chart.label(value))
+
+        painter.save()
+        painter.translate(12, plot.center().y())
+        painter.rotate(-90)
+        painter.drawText(QRectF(-plot.height() / 2, -8, plot.height(), 16), Qt.AlignCenter, self.chart.y_label)
+        painter.restore()
+
+    def _legend_rows(self):
+        """Lay the legend out in rows that fit the width: lists of (series index, elided name, x)."""
+        metrics = QFontMetrics(self.font())
+        rows = [[]]
+        x = MARGIN_LEFT
+        for index, (name, _) in enumerate(self.chart.series):
+            name = metrics.elidedText(name, Qt.ElideRight, LEGEND_NAME_WIDTH)
+            width = 16 + metrics.horizontalAdvance(name) + 14
+            if x + width > self.width() - MARGIN_RIGHT and rows[-1]:
+                rows.append([])
+                x = MARGIN_LEFT
+            rows[-1].append((index, name, x))
+            x += width
+        return rows
+
+    def _draw_legend(self, painter, rows):
+        metrics = QFontMetrics(self.font())
+        painter.setPen(QPen(self.palette().text().color()))
+        painter.drawText(QRectF(MARGIN_LEFT, MARGIN_TOP, self.width() - MARGIN_LEFT, metrics.height()),
+                         Qt.AlignLeft | Qt.AlignVCenter, self.chart.title)
+        for row_index, row in enumerate(rows):
+            y = MARGIN_TOP + metrics.height() * (row_index + 1) + 4
+            for index, name, x in row:
+                painter.fillRect(QRectF(x, y + metrics.height() / 2 - 5, 10, 10),
+                                 QColor(SERIES_COLORS[index % len(SERIES_COLORS)]))
+                painter.drawText(QRectF(x + 16, y, LEGEND_NAME_WIDTH + 14, metrics.height()),
+                                 Qt.AlignLeft | Qt.AlignVCenter, name)
+
+
+def _nice_step(raw):
+    """Round a tick step up to 1, 2 or 5 times a power of ten."""
+    if raw <= 0:
+        return 1.0
+    magnitude = 10 ** math.floor(math.log10(raw))
+    for factor in (1, 2, 5, 10):
+        if raw <= factor * magnitude:
+            return factor * magnitude
+    return 10 * magnitude
@@ -0,0 +1,102 @@
+from PyQt5.QtCore import QDate
+from PyQt5.QtWidgets import QGridLayout, QLabel, QDateEdit, QDialog, QComboBox, QMessageBox
+
+from TaskRunner import get_task_runner
+from TrendChart import TrendChart
+from analytics_utils import get_analytics, trend_chart, BUCKETS, CHARTS, SERIES_NAMES
+from data_access import get_repository
+
+EPOCH = QDate(1970, 1, 1)  # Analytics days count from here
+
+
+class TrendsDialog(QDialog):
+    """Trend charts over the whole history, drawn from the in-memory analytics snapshot."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Trend Charts")
+        self.resize(900, 550)
+        self.setLayout(QGridLayout())
+        self.columns = None
+        self.names = {}
+
+        self.layout().addWidget(QLabel("Chart:"), 0, 0)
+        self.chart_type = QComboBox()
+        self.chart_type.addItems(CHARTS)
+        self.layout().addWidget(self.chart_type, 0, 1)
+
+        self.layout().addWidget(QLabel("Per:"), 0, 2)
+        self.bucket = QComboBox()
+        self.bucket.addItems(BUCKETS)
+        self.bucket.setCurrentText("Month")
+        self.layout().addWidget(self.bucket, 0, 3)
+
+        self.layout().addWidget(QLabel("From:"), 1, 0)
+        self.start_date = QDateEdit()
+        self.start_date.setCalendarPopup(True)
+        self.start_date.setDisplayFormat("MM/dd/yyyy")
+        self.start_date.setDate(QDate.currentDate().addYears(-1))
+        self.layout().addWidget(self.start_date, 1, 1)
+
+        self.layout().addWidget(QLabel("To:"), 1, 2)
+        self.end_date = QDateEdit()
+        self.end_date.setCalendarPopup(True)
+        self.end_date.setDisplayFormat("MM/dd/yyyy")
+        self.end_date.setDate(QDate.currentDate())
+        self.layout().addWidget(self.end_date, 1, 3)
+
+        self.chart = TrendChart()
+        self.layout().addWidget(self.chart, 2, 0, 1, 4)
+        self.summary = QLabel("")
+        self.layout().addWidget(self.summary, 3, 0, 1, 4)
+
+        # Every control redraws from the arrays already in memory
+        self.chart_type.currentTextChanged.connect(self.update_chart)
+        self.bucket.currentTextChanged.connect(self.update_chart)
+        self.start_date.dateChanged.connect(self.update_chart)
+        self.end_date.dateChanged.connect(self.update_chart)
+
+        get_task_runner().submit("trends", self._load_snapshot, on_done=self.snapshot_loaded,
+                                 on_error=self.load_failed)
+
+    @staticmethod
+    def _load_snapshot():
+        """Refresh the analytics snapshot and read the names of the charted ids (worker thread)."""
+        repository = get_repository()
+        columns = get_analytics().refresh(repository)
+        names = {column: repository.lookup_names(column) for column in SERIES_NAMES.values()}
+        return columns, names
+
+    def snapshot_loaded(self, result):
+        self.columns, self.names = result
+        days = self.columns["day"]
+        if len(days):
+            # Start out showing the whole history
+            for edit, day in [(self.start_date, days.min()), (self.end_date, days.max())]:
+                edit.blockSignals(True)
+                edit.setDate(EPOCH.addDays(int(day)))
+                edit.blockSignals(False)
+        self.update_chart()
+
+    def update_chart(self):
+        if self.columns is None:
+            return
+        start_day = EPOCH.daysTo(self.start_date.date())
+        end_day = EPOCH.daysTo(self.end_date.date())
+        if start_day > end_day:
+            self.chart.set_message("The start date is after the end date.")
+            self.summary.setText("")
+            return
+        # About one point every two pixels; longer ranges are downsampled
+        chart = trend_chart(self.columns, self.chart_type.currentText(), self.bucket.currentText(), start_day,
+                            end_day, self.names, max_points=max(50, self.chart.width() // 2))
+        self.chart.set_chart(chart)
+        self.summary.setText(f"{chart.records} records")
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.update_chart()
+
+    def load_failed(self, error):
+        self.chart.set_message("")
+        QMessageBox.critical(self, "Error", f"Failed to load trend data: {error}")
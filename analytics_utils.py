@@ -0,0 +1,267 @@
+# Columnar snapshot of the records for trend charts
+#
+# AnalyticsCache keeps one NumPy array per column (key, day, stringer, string, racket, tension) and saves
+# them next to the database as stringing.analytics.npz. refresh() only reads the records whose change_seq
+# is newer than the snapshot's, and the tombstones of those deleted since, so after the first build keeping
+# it current costs a query over a handful of rows. Tension is the main tension in lbs that the database already
+# parses into tension_main. Charts are aggregated from the arrays with vectorized bucketing and bincount, and
+# long series are downsampled to what the chart can show, so changing a chart never goes back to SQLite.
+import os
+import tempfile
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+from data_access import get_repository
+from database_utils import DATABASE_PATH, MAX_TENSION_LBS
+from profiler import timed
+
+CACHE_SUFFIX = ".analytics.npz"  # Next to the database, named after it
+CACHE_VERSION = 3
+CHUNK_ROWS = 50000  # Rows read from the cursor per batch
+MAX_POINTS = 400  # Points per series when the caller doesn't say; longer series are downsampled
+TOP_SERIES = 6  # Busiest stringers/strings/rackets charted; the rest are summed as "Other"
+NO_DATE = np.iinfo(np.int32).min  # Day of records whose date couldn't be read; they are left out
+
+# key: the first 64 bits of the record's uuid, which never changes, so edits and deletions find their row
+COLUMNS = {"key": np.uint64, "day": np.int32, "stringer_id": np.int32, "string_id": np.int32,
+           "racket_id": np.int32, "tension": np.float32}
+
+# Chart name -> the column counted per series; None charts tension percentiles instead
+CHARTS = {
+    "Rackets per Stringer": "stringer_id",
+    "String Popularity": "string_id",
+    "Racket Popularity": "racket_id",
+    "Tension Distribution": None,
+}
+# The lookup column (see LOOKUP_COLUMNS) naming each id column's values
+SERIES_NAMES = {"stringer_id": "who_strung", "string_id": "string", "racket_id": "racket"}
+BUCKETS = ["Week", "Month", "Quarter", "Year"]
+TENSION_PERCENTILES = [("25th percentile", 0.25), ("Median", 0.5), ("75th percentile", 0.75)]
+
+# x: bucket numbers; series: (name, values) pairs aligned with x; label(x) formats an x value for the axis;
+# records: how many records the chart was drawn from
+Chart = namedtuple("Chart", ["title", "x", "series", "label", "y_label", "y_from_zero", "records"])
+
+
+class AnalyticsCache:
+    """The records as columns of NumPy arrays, persisted to disk and refreshed incrementally."""
+
+    def __init__(self, path=None):
+        self.path = path or os.path.splitext(DATABASE_PATH)[0] + CACHE_SUFFIX
+        self.columns = None  # Column name -> array; replaced whole, never changed in place
+        self.seq = 0  # Change sequence number the snapshot is current to
+        self.station = None
+        self._lock = threading.Lock()
+
+    def refresh(self, repository=None):
+        """Bring the snapshot up to date with the database and return its columns (worker thread)."""
+        repository = repository or get_repository()
+        with self._lock:
+            if self.columns is None:
+                self._load()
+            with repository.snapshot(), timed("analytics: refresh") as timing:
+                seq, station = repository.sync_state()
+                if station != self.station or seq < self.seq:
+                    # Another database, or one restored from an older backup
+                    self.columns, self.seq, self.station = _empty_columns(), 0, station
+                if seq == self.seq:
+                    timing.rows = 0
+                    return self.columns
+                changed = _read_columns(repository.analytics_cursor(self.seq))
+                deleted = uuid_keys(repository.deleted_since(self.seq) if self.seq else [])
+                timing.rows = len(changed["key"]) + len(deleted)
+                columns = self.columns
+                keep = ~np.isin(columns["key"], np.concatenate([changed["key"], deleted]))
+                dated = changed["day"] != NO_DATE
+                self.columns = {name: np.concatenate([columns[name][keep], changed[name][dated]])
+                                for name in COLUMNS}
+                self.seq = seq
+            self._save()
+            return self.columns
+
+    def _load(self):
+        self.columns, self.seq, self.station = _empty_columns(), 0, None
+        if not os.path.exists(self.path):
+            return
+        try:
+            with timed("analytics: load cache"), np.load(self.path, allow_pickle=False) as data:
+                if int(data["version"]) != CACHE_VERSION:
+                    return
+                self.columns = {name: data[name].astype(dtype, copy=False) for name, dtype in COLUMNS.items()}
+                self.seq, self.station = int(data["seq"]), str(data["station"])
+        except Exception as e:
+            # Rebuilt from the database on this refresh
+            print(f"Ignoring unreadable analytics cache: {e}")
+            self.columns, self.seq, self.station = _empty_columns(), 0, None
+
+    def _save(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        handle, temp_path = tempfile.mkstemp(suffix=".npz.tmp", dir=directory)
+        try:
+            with timed("analytics: save cache"), os.fdopen(handle, "wb") as file:
+                np.savez(file, version=CACHE_VERSION, seq=self.seq, station=self.station, **self.columns)
+            os.replace(temp_path, self.path)
+        except Exception as e:
+            print(f"Failed to save analytics cache: {e}")
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+
+def trend_chart(columns, chart, bucket, start_day, end_day, names=None, max_points=MAX_POINTS):
+    """Aggregate `columns` into a Chart of `chart` (one of CHARTS) per `bucket` (one of BUCKETS).
+
+    `start_day` and `end_day` are days since 1970-01-01, inclusive. `names` maps each lookup column
+    to {id: name} for the series names.
+    """
+    with timed(f"analytics: {chart}") as timing:
+        in_range = (columns["day"] >= start_day) & (columns["day"] <= end_day)
+        group_column = CHARTS[chart]
+        if group_column is None:
+            in_range &= ~np.isnan(columns["tension"])
+        buckets = _bucketed(columns["day"], bucket)[in_range]
+        timing.rows = len(buckets)
+        first = bucket_days(np.array([start_day], dtype=np.int32), bucket)[0]
+        last = bucket_days(np.array([end_day], dtype=np.int32), bucket)[0]
+        x = np.arange(first, last + 1)
+        if group_column is None:
+            values = tension_percentiles(buckets - first, columns["tension"][in_range], len(x))
+            series = [(name, values[:, index]) for index, (name, _) in enumerate(TENSION_PERCENTILES)]
+            y_label = "Tension (lbs)"
+        else:
+            ids, counts = counts_by_group(buckets - first, columns[group_column][in_range], len(x))
+            lookup = (names or {}).get(SERIES_NAMES[group_column], {})
+            series = [("Other" if group_id < 0 else lookup.get(group_id, f"#{group_id}"), counts[:, index])
+                      for index, group_id in enumerate(ids)]
+            y_label = f"Rackets per {bucket.lower()}"
+        x, values = downsample(x, [column for _, column in series], max_points)
+        return Chart(f"{chart} by {bucket}", x, [(name, column) for (name, _), column in zip(series, values)],
+                     lambda value: bucket_label(value, bucket), y_label, group_column is not None, len(buckets))
+
+
+def bucket_days(days, bucket):
+    """Return the bucket number of each day (days since 1970-01-01): weeks start on Monday."""
+    if bucket == "Week":
+        return (days.astype(np.int64) + 3) // 7  # 1970-01-01 was a Thursday
+    months = days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    if bucket == "Month":
+        return months
+    if bucket == "Quarter":
+        return months // 3
+    return months // 12
+
+
+def _bucketed(days, bucket):
+    """bucket_days of a whole day column, remembered until a refresh replaces the column."""
+    remembered = _bucket_memo.get(bucket)
+    if remembered is None or remembered[0] is not days:
+        remembered = (days, bucket_days(days, bucket))
+        _bucket_memo[bucket] = remembered
+    return remembered[1]
+
+
+def bucket_label(value, bucket):
+    """Format a bucket number from bucket_days for the chart axis."""
+    value = int(value)
+    if bucket == "Week":
+        return str(np.datetime64(value * 7 - 3, "D"))
+    if bucket == "Month":
+        return str(np.datetime64(value, "M"))
+    if bucket == "Quarter":
+        return f"{1970 + value // 4} Q{value % 4 + 1}"
+    return str(1970 + value)
+
+
+def counts_by_group(positions, groups, length, top=TOP_SERIES):
+    """Count records per (position, group) for the `top` busiest groups, summing the rest as group -1.
+
+    Returns (group ids, counts) with counts shaped (length, len(group ids)), busiest group first.
+    """
+    if not len(groups):
+        return [], np.zeros((length, 0), dtype=np.int64)
+    totals = np.bincount(groups)
+    busiest = np.argsort(totals)[::-1][:top]
+    busiest = busiest[totals[busiest] > 0]
+    # Column of each group id in the result; every other group goes to the last ("Other") column
+    column_of = np.full(len(totals), len(busiest))
+    column_of[busiest] = np.arange(len(busiest))
+    width = len(busiest) + 1
+    counts = np.bincount(positions * width + column_of[groups], minlength=length * width).reshape(length, width)
+    ids = busiest.tolist()
+    if counts[:, -1].any():
+        return ids + [-1], counts
+    return ids, counts[:, :-1]
+
+
+def tension_percentiles(positions, tensions, length):
+    """Return TENSION_PERCENTILES of `tensions` per position, shaped (length, percentiles); NaN where empty."""
+    result = np.full((length, len(TENSION_PERCENTILES)), np.nan, dtype=np.float32)
+    if not len(tensions):
+        return result
+    # One sort of position and tension packed into a float orders by position, then tension
+    packed = np.sort(positions * (MAX_TENSION_LBS + 1.0) + tensions)
+    positions = (packed // (MAX_TENSION_LBS + 1.0)).astype(np.int64)
+    tensions = packed - positions * (MAX_TENSION_LBS + 1.0)
+    present, starts, sizes = np.unique(positions, return_index=True, return_counts=True)
+    for index, (_, fraction) in enumerate(TENSION_PERCENTILES):
+        # Nearest rank within each position's sorted run
+        result[present, index] = tensions[starts + np.floor(fraction * (sizes - 1)).astype(np.int64)]
+    return result
+
+
+def downsample(x, series, max_points):
+    """Reduce series longer than `max_points` to the minimum and maximum of each run of points.
+
+    Peaks and dips survive, which averaging would flatten. Returns (x, series) with two points per run.
+    """
+    if len(x) <= max_points:
+        return x, series
+    starts = np.linspace(0, len(x), max(1, max_points // 2), endpoint=False).astype(np.int64)
+    reduced = []
+    for values in series:
+        values = values.astype(np.float64)
+        lows, highs = np.fmin.reduceat(values, starts), np.fmax.reduceat(values, starts)
+        reduced.append(np.column_stack([lows, highs]).ravel())
+    return np.repeat(x[starts], 2), reduced
+
+
+def uuid_keys(uuids):
+    """Return the COLUMNS key of each uuid (32 hex digits)."""
+    return np.array([int(value[:16], 16) for value in uuids], dtype=np.uint64)
+
+
+def _read_columns(cursor):
+    """Read (uuid, day, stringer_id, string_id, racket_id, tension) rows from `cursor` into COLUMNS arrays."""
+    chunks = []
+    while True:
+        rows = cursor.fetchmany(CHUNK_ROWS)
+        if not rows:
+            break
+        numbers = np.array([row[1:5] for row in rows], dtype=np.int64).reshape(-1, 4)
+        # A NULL tension_main (unreadable tension) becomes NaN
+        tensions = np.array([row[5] for row in rows], dtype=np.float64)
+        chunks.append([uuid_keys([row[0] for row in rows])] + [numbers[:, index] for index in range(4)] + [tensions])
+    if not chunks:
+        return _empty_columns()
+    return {name: np.concatenate([chunk[index] for chunk in chunks]).astype(dtype, copy=False)
+            for index, (name, dtype) in enumerate(COLUMNS.items())}
+
+
+def _empty_columns():
+    return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+
+
+_bucket_memo = {}  # bucket -> (day column, its bucket numbers)
+_analytics = None
+_analytics_lock = threading.Lock()
+
+
+def get_analytics():
+    """Return the process-wide AnalyticsCache, creating it on first use."""
+    global _analytics
+    with _analytics_lock:
+        if _analytics is None:
+            _analytics = AnalyticsCache()
+        return _analytics
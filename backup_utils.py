@@ -1,69 +1,149 @@
+import glob
+import gzip
 import os
 import shutil
 import sqlite3
-import pandas as pd
-from datetime import datetime, timedelta
+import tempfile
+import threading
+import time
+from datetime import datetime
 
-def backup_database_on_launch():
-    database_file = "stringing.db"
-    backup_dir = "backup"
-    backup_file = os.path.join(backup_dir, "stringing_backup.db")
+import startup_trace
+from data_access import get_repository
+from database_utils import DATABASE_PATH
+from profiler import timed
+
+BACKUP_DIR = os.path.join(os.path.dirname(DATABASE_PATH), "backup")
+BACKUP_INTERVAL_DAYS = 1  # Minimum age of the newest backup before another is made
+BACKUP_GENERATIONS = 7  # Compressed .db backups kept; older ones are deleted
+BACKUP_PAGES = 256  # Pages copied per backup step, letting other connections write in between
+EXCEL_BACKUP = True  # Also dump the records to an Excel workbook after each backup
+STALE_TEMP_HOURS = 24  # Temp files untouched this long belong to no running backup and are deleted
+
+
+def start_background_backup(include_excel=EXCEL_BACKUP):
+    """Run backup_database_on_launch on a background thread and return the thread."""
+    def run():
+        with startup_trace.span("backup (background)"):
+            try:
+                backup_database_on_launch(include_excel)
+            except Exception as e:
+                print(f"Failed to create database backup: {e}")
+            finally:
+                get_repository().release_connection()
+
+    thread = threading.Thread(target=run, name="backup", daemon=True)
+    thread.start()
+    return thread
+
+
+def backup_database_on_launch(include_excel=EXCEL_BACKUP, force=False):
+    """Make a compressed, rotated backup of the database unless a recent one already covers it.
+
+    The copy is taken with SQLite's online backup API, so it is consistent even while the app writes,
+    and is only renamed into place once complete, so a failure never costs an existing backup.
+    `force` skips the age and change checks. Returns the new backup's path, or None if none was
+    needed; raises if the database backup could not be written.
+    """
+    backup_dir = BACKUP_DIR
     excel_backup_file = os.path.join(backup_dir, "stringing_backup.xlsx")
-    last_backup_file = os.path.join(backup_dir, "last_backup.txt")  # File to track last backup date
+    last_backup_file = os.path.join(backup_dir, "last_backup.txt")  # File to track last backup date and changes
 
     # Ensure the backup directory exists
     os.makedirs(backup_dir, exist_ok=True)
+    _remove_stale_temp_files(backup_dir)
 
-    # Check the last backup date
-    last_backup_date = None
+    # Check the last backup date and the change count it covered
+    last_backup_date, last_change_count = None, None
     if os.path.exists(last_backup_file):
         try:
             with open(last_backup_file, "r") as file:
-                last_backup_date = datetime.strptime(file.read().strip(), "%Y-%m-%d")
+                lines = file.read().split()
+            last_backup_date = datetime.strptime(lines[0], "%Y-%m-%d")
+            if len(lines) > 1:
+                last_change_count = int(lines[1])
         except Exception as e:
             print(f"Failed to read last backup date: {e}")
 
     # Determine if a backup is needed
-    if last_backup_date and (datetime.now() - last_backup_date).days < 30:
-        print("Backup not needed. Last backup was less than a month ago.")
-        return
+    if not force and last_backup_date and (datetime.now() - last_backup_date).days < BACKUP_INTERVAL_DAYS:
+        print("Backup not needed. Last backup is recent.")
+        return None
+    repository = get_repository()
+    change_count = repository.change_count()
+    if not force and change_count == last_change_count and _backup_generations(backup_dir):
+        print("Backup not needed. Database has not changed since the last backup.")
+        return None
 
-    # Delete the old backups if they exist
-    for file in [backup_file, excel_backup_file]:
-        if os.path.exists(file):
-            try:
-                os.remove(file)
-                print(f"Old backup deleted: {file}")
-            except Exception as e:
-                print(f"Failed to delete old backup: {e}")
+    # Create a new compressed .db backup
+    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    backup_file = os.path.join(backup_dir, f"stringing_backup_{timestamp}.db.gz")
+    _write_backup(repository.connection, backup_dir, backup_file)
+    print(f"Database backup created: {backup_file}")
 
-    # Create a new .db backup
-    try:
-        shutil.copy(database_file, backup_file)
-        print(f"Database backup created: {backup_file}")
-    except Exception as e:
-        print(f"Failed to create database backup: {e}")
+    # Keep only the newest generations
+    for old_backup in _backup_generations(backup_dir)[BACKUP_GENERATIONS:]:
+        try:
+            os.remove(old_backup)
+            print(f"Old backup deleted: {old_backup}")
+        except Exception as e:
+            print(f"Failed to delete old backup: {e}")
 
     # Create a new Excel backup
-    try:
-        conn = sqlite3.connect(database_file)
-        query = "SELECT name FROM sqlite_master WHERE type='table';"
-        tables = [row[0] for row in conn.execute(query).fetchall()]
-
-        with pd.ExcelWriter(excel_backup_file, engine='openpyxl') as writer:
-            for table in tables:
-                df = pd.read_sql_query(f"SELECT * FROM {table}", conn)
-                df.to_excel(writer, sheet_name=table, index=False)
+    if include_excel:
+        try:
+            from export_utils import export_file
 
-        conn.close()
-        print(f"Excel backup created: {excel_backup_file}")
-    except Exception as e:
-        print(f"Failed to create Excel backup: {e}")
+            with timed("backup: excel export"):
+                export_file(excel_backup_file, repository=repository)
+            print(f"Excel backup created: {excel_backup_file}")
+        except Exception as e:
+            print(f"Failed to create Excel backup: {e}")
 
     # Update the last backup date
     try:
         with open(last_backup_file, "w") as file:
-            file.write(datetime.now().strftime("%Y-%m-%d"))
+            file.write(f"{datetime.now().strftime('%Y-%m-%d')}\n{change_count}\n")
         print(f"Last backup date updated: {datetime.now().strftime('%Y-%m-%d')}")
     except Exception as e:
         print(f"Failed to update last backup date: {e}")
+    return backup_file
+
+
+def _write_backup(conn, backup_dir, backup_file):
+    """Copy the database page by page into a temp file, gzip it, and rename the result to `backup_file`."""
+    handle, raw_path = tempfile.mkstemp(suffix=".db.tmp", dir=backup_dir)
+    os.close(handle)
+    compressed_path = backup_file + ".tmp"
+    try:
+        target = sqlite3.connect(raw_path)
+        try:
+            with timed("backup: copy database"):
+                conn.backup(target, pages=BACKUP_PAGES)
+        finally:
+            target.close()
+        with timed("backup: compress"), open(raw_path, "rb") as source, \
+                gzip.open(compressed_path, "wb", compresslevel=6) as destination:
+            shutil.copyfileobj(source, destination, 1024 * 1024)
+        os.replace(compressed_path, backup_file)
+    finally:
+        for path in (raw_path, compressed_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def _backup_generations(backup_dir):
+    """Return existing compressed backups, newest first."""
+    return sorted(glob.glob(os.path.join(backup_dir, "stringing_backup_*.db.gz")), reverse=True)
+
+
+def _remove_stale_temp_files(backup_dir):
+    # Left behind if the app exited in the middle of a backup. Recent ones may belong to a backup running in
+    # another process (e.g. `cli.py backup` from a scheduler while the app backs up), so they are left alone.
+    cutoff = time.time() - STALE_TEMP_HOURS * 3600
+    for path in glob.glob(os.path.join(backup_dir, "*.tmp")):
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
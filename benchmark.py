@@ -0,0 +1,328 @@
+# Headless benchmark of the app's hot paths against synthetic stringing data
+#
+#   python benchmark.py                              # 10k, 100k and 1M records
+#   python benchmark.py --sizes 10000 --output before.json
+#   python benchmark.py --sizes 10000 --compare before.json
+#
+# Each size runs in its own process against a fresh database in a temporary directory, so the
+# real stringing.db is never touched. Results are JSON; --compare exits with status 1 when any
+# benchmark is slower than the given file by more than --threshold.
+import argparse
+import contextlib
+import csv
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+FIRST_NAMES = ["James", "Maria", "Wei", "Olivia", "Noah", "Emma", "Liam", "Sofia", "Lucas", "Mia", "Arjun",
+               "Chloe", "Mateo", "Aisha", "Ethan", "Yuki", "Daniel", "Elena", "Samuel", "Nora"]
+LAST_NAMES = ["Smith", "Garcia", "Chen", "Johnson", "Müller", "Rossi", "Kim", "Nguyen", "Brown", "Silva",
+              "Patel", "Martin", "Lopez", "Novak", "Williams", "Cohen", "Tanaka", "Dubois", "Kowalski", "Ali"]
+RACKETS = [f"{brand} {model}" for brand in ["Babolat", "Wilson", "Head", "Yonex", "Prince", "Tecnifibre"]
+           for model in ["Pure Drive", "Pro Staff 97", "Speed MP", "Ezone 100", "Blade 98", "Radical MP",
+                         "Aero", "Clash 100", "TF40", "Gravity Pro"]]
+STRINGS = ["RPM Blast", "Luxilon ALU Power", "Solinco Hyper-G", "Tecnifibre X-One", "Wilson NXT",
+           "Babolat VS Touch", "Head Lynx Tour", "Yonex Poly Tour Pro", "Volkl Cyclone", "Signum Pro Firestorm",
+           "Prince Synthetic Gut", "Kirschbaum Max Power", "Diadem Solstice", "MSV Focus Hex"]
+STRINGERS = ["Alex", "Sam", "Jordan", "Casey", "Riley", "Morgan"]
+TENSIONS = [str(lbs) for lbs in range(44, 63)] + ["55/53", "52/50", "24 kg", "23/22 kg"]
+YEARS_OF_HISTORY = 8
+
+
+def skewed_choices(rng, values, count, skew=1.1):
+    """Zipf-like sample: the first values are picked far more often than the last."""
+    weights = [1 / (rank ** skew) for rank in range(1, len(values) + 1)]
+    return rng.choices(values, weights=weights, k=count)
+
+
+def generate_records(count, seed=0):
+    """Return `count` (name, racket, string, tension, date_strung, date_strung_raw, who_strung) tuples."""
+    rng = random.Random(seed)
+    customers = [f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {number}"
+                 for number in range(max(10, count // 8))]
+    rng.shuffle(customers)
+    names = skewed_choices(rng, customers, count, skew=0.8)  # Regulars come back again and again
+    rackets = skewed_choices(rng, RACKETS, count)
+    strings = skewed_choices(rng, STRINGS, count)
+    tensions = skewed_choices(rng, TENSIONS, count, skew=0.5)
+    stringers = skewed_choices(rng, STRINGERS, count, skew=1.5)
+    first_day = date.today() - timedelta(days=365 * YEARS_OF_HISTORY)
+    # Business grows over time, so recent days are busier
+    days = sorted(int((365 * YEARS_OF_HISTORY) * rng.random() ** 0.7) for _ in range(count))
+    return [(names[i], rackets[i], strings[i], tensions[i], (first_day + timedelta(days=days[i])).isoformat(), None,
+             stringers[i]) for i in range(count)]
+
+
+def run_size(size, repeat, workdir):
+    """Benchmark one dataset size in this process and return a list of result dicts."""
+    database_path = os.path.join(workdir, "stringing.db")
+    os.environ["STRINGING_DB"] = database_path  # Read when database_utils is imported
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+    from PyQt5.QtWidgets import QApplication, QMessageBox
+    app = QApplication.instance() or QApplication([])
+    # Dialog pop-ups would block a headless run
+    QMessageBox.information = staticmethod(lambda *args, **kwargs: QMessageBox.Ok)
+    QMessageBox.critical = staticmethod(lambda *args, **kwargs: QMessageBox.Ok)
+
+    from database_utils import setup_database
+    from data_access import get_repository
+    import backup_utils
+    import export_utils
+    import import_utils
+
+    results = []
+
+    def record(name, timings, **extra):
+        results.append(dict(size=size, benchmark=name, seconds=statistics.median(timings),
+                            runs=[round(t, 6) for t in timings], **extra))
+
+    def wait_until(predicate, timeout=300):
+        deadline = time.perf_counter() + timeout
+        while not predicate():
+            if time.perf_counter() > deadline:
+                raise TimeoutError("benchmark step did not finish")
+            app.processEvents()
+            time.sleep(0.0005)
+
+    def timed(step, done):
+        begin = time.perf_counter()
+        step()
+        wait_until(done)
+        return time.perf_counter() - begin
+
+    records = generate_records(size)
+    begin = time.perf_counter()
+    setup_database()
+    repository = get_repository()
+    with repository.transaction():
+        repository.insert_records(records)
+    record("populate", [time.perf_counter() - begin])
+
+    from main_window import MainWindow
+    from AddEditRecordDialog import AddEditRecordDialog
+    from ReportDialog import ReportDialog
+
+    window = MainWindow()
+    window.show()
+    wait_until(lambda: window.model.rowCount() > 0)
+
+    def load_records():
+        window.search_input.setText("")
+        window.load_records()
+
+    record("load_records", [timed(load_records, lambda: not window.model.is_loading()) for _ in range(repeat)])
+
+    # The last full page, as reached by scrolling to the bottom; it should cost about the same as the first
+    from RecordsTableModel import PAGE_SIZE
+    deepest = repository.connection.execute(
+        "SELECT date_strung, id FROM StringingRecords WHERE date_strung IS NOT NULL ORDER BY date_strung, id "
+        "LIMIT 1 OFFSET ?", (PAGE_SIZE,)).fetchone()
+    record("load_page[deep]", [timed(lambda: repository.fetch_page("", PAGE_SIZE, tuple(deepest)), lambda: True)
+                               for _ in range(repeat)])
+
+    # One keystroke at a time, as typed into the search box (the debounce delay itself is not counted)
+    customer = records[len(records) // 2][0]
+    keystrokes = []
+    for _ in range(repeat):
+        for length in range(1, len(customer) + 1):
+            def type_key(text=customer[:length]):
+                window.search_input.setText(text)
+                window.load_records()
+            keystrokes.append(timed(type_key, lambda: not window.model.is_loading()))
+    record("search_keystroke", keystrokes)
+
+    # A term most records match, such as the best-selling brand; each page has to skip the records it excludes
+    brand = RACKETS[0].split()[0]
+    keystrokes = []
+    for _ in range(repeat):
+        for length in range(1, len(brand) + 1):
+            def type_key(text=brand[:length]):
+                window.search_input.setText(text)
+                window.load_records()
+            keystrokes.append(timed(type_key, lambda: not window.model.is_loading()))
+    record("search_keystroke[common term]", keystrokes)
+
+    def search_tension_range():
+        window.search_input.setText("tension:50-55")
+        window.load_records()
+
+    record("search_tension_range", [timed(search_tension_range, lambda: not window.model.is_loading())
+                                    for _ in range(repeat)])
+
+    def save_record():
+        dialog = AddEditRecordDialog(window)
+        dialog.name.setText("Benchmark Customer")
+        dialog.racket.setText(RACKETS[0])
+        dialog.string.setText(STRINGS[0])
+        dialog.tension.setText("55")
+        dialog.date_strung.setText(date.today().strftime("%m/%d/%Y"))
+        dialog.who_strung.setText(STRINGERS[0])
+        dialog.show()
+        dialog.save_record()
+        wait_until(lambda: not dialog.isVisible())
+
+    record("save_record", [timed(save_record, lambda: True) for _ in range(repeat)])
+
+    report_dialog = ReportDialog(window)
+    report_dialog.start_date.setDate(report_dialog.start_date.date().addYears(-YEARS_OF_HISTORY))
+    for dimension in [report_dialog.dimension.itemText(i) for i in range(report_dialog.dimension.count())]:
+        report_dialog.dimension.setCurrentText(dimension)
+        record(f"generate_report[{dimension}]",
+               [timed(report_dialog.generate_report, report_dialog.generate_button.isEnabled)
+                for _ in range(repeat)])
+
+    export_csv = os.path.join(workdir, "export.csv")
+    record("export_records[csv]", [timed(lambda: export_utils.export_file(export_csv), lambda: True)
+                                   for _ in range(repeat)])
+    export_xlsx = os.path.join(workdir, "export.xlsx")
+    record("export_records[xlsx]", [timed(lambda: export_utils.export_file(export_xlsx), lambda: True)])
+
+    # Import as many records again, none of them stored yet
+    import_csv = os.path.join(workdir, "import.csv")
+    with open(import_csv, "w", newline="", encoding="utf-8") as target:
+        writer = csv.writer(target)
+        writer.writerow(import_utils.REQUIRED_COLUMNS)
+        for name, racket, string, tension, date_strung, _, who_strung in generate_records(size, seed=1):
+            writer.writerow([name, racket, string, tension, date_strung, who_strung])
+    record("import_records[csv]", [timed(lambda: import_utils.import_file(import_csv), lambda: True)])
+
+    # The CSV export back in (same columns the import expects, renamed): every row is already stored
+    reimport_csv = os.path.join(workdir, "reimport.csv")
+    with open(export_csv, encoding="utf-8") as source, open(reimport_csv, "w", encoding="utf-8") as target:
+        source.readline()
+        target.write(",".join(import_utils.REQUIRED_COLUMNS) + "\n")
+        for line in source:
+            target.write(line)
+    record("import_records[csv, already stored]",
+           [timed(lambda: import_utils.import_file(reimport_csv), lambda: True)])
+
+    last_backup_file = os.path.join(backup_utils.BACKUP_DIR, "last_backup.txt")
+
+    def backup(include_excel):
+        if os.path.exists(last_backup_file):
+            os.remove(last_backup_file)
+        backup_utils.backup_database_on_launch(include_excel)
+
+    record("backup_database_on_launch", [timed(lambda: backup(False), lambda: True) for _ in range(repeat)])
+    record("backup_database_on_launch[skipped]",
+           [timed(lambda: backup_utils.backup_database_on_launch(False), lambda: True) for _ in range(repeat)])
+
+    # Trend charts: building the columnar snapshot, keeping it current, and aggregating from memory
+    import analytics_utils
+
+    cache_file = os.path.join(workdir, "analytics.npz")
+
+    def cold_refresh():
+        if os.path.exists(cache_file):
+            os.remove(cache_file)
+        analytics_utils.AnalyticsCache(cache_file).refresh()
+
+    record("analytics_refresh[cold]", [timed(cold_refresh, lambda: True) for _ in range(repeat)])
+    analytics = analytics_utils.AnalyticsCache(cache_file)
+    analytics.refresh()
+
+    def incremental_refresh():
+        repository.insert_record("Benchmark Customer", RACKETS[1], STRINGS[1], "56", date.today().isoformat(),
+                                 STRINGERS[1])
+        analytics.refresh()
+
+    record("analytics_refresh[incremental]", [timed(incremental_refresh, lambda: True) for _ in range(repeat)])
+    columns = analytics.columns
+    start_day, end_day = int(columns["day"].min()), int(columns["day"].max())
+    for chart in analytics_utils.CHARTS:
+        record(f"trend_chart[{chart}]",
+               [timed(lambda: analytics_utils.trend_chart(columns, chart, "Week", start_day, end_day), lambda: True)
+                for _ in range(repeat)])
+
+    window.close()
+    repository.close()
+    return results
+
+
+def run(sizes, repeat):
+    results = []
+    for size in sizes:
+        with tempfile.TemporaryDirectory(prefix="stringing-bench-") as workdir:
+            print(f"Benchmarking {size} records...", file=sys.stderr, flush=True)
+            output = subprocess.run([sys.executable, os.path.abspath(__file__), "--run-size", str(size),
+                                     "--repeat", str(repeat), "--workdir", workdir],
+                                    check=True, stdout=subprocess.PIPE, text=True).stdout
+            results.extend(json.loads(output))
+    return {"meta": _environment(), "results": results}
+
+
+def compare(current, baseline, threshold):
+    """Print the change of every benchmark against `baseline`; return the regressions beyond `threshold`."""
+    previous = {(item["size"], item["benchmark"]): item["seconds"] for item in baseline["results"]}
+    regressions = []
+    for item in current["results"]:
+        before = previous.get((item["size"], item["benchmark"]))
+        if before is None:
+            continue
+        change = (item["seconds"] - before) / before if before else 0.0
+        flag = ""
+        if change > threshold:
+            regressions.append(item)
+            flag = "  REGRESSION"
+        print(f"{item['size']:>9}  {item['benchmark']:<40} {before:10.4f}s -> {item['seconds']:10.4f}s "
+              f"({change:+.0%}){flag}", file=sys.stderr)
+    return regressions
+
+
+def _environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(__file__) or ".",
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "commit": commit, "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version, "platform": platform.platform()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the stringing tracker on synthetic data")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES),
+                        help="comma-separated record counts (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per benchmark; the median is reported")
+    parser.add_argument("--output", help="write the JSON results to this file instead of stdout")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="slowdown (fraction) counted as a regression by --compare (default: %(default)s)")
+    parser.add_argument("--run-size", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_size:
+        # stdout carries the JSON; the app's own progress messages go to stderr
+        with contextlib.redirect_stdout(sys.stderr):
+            results = run_size(args.run_size, args.repeat, args.workdir)
+        json.dump(results, sys.stdout)
+        # Skip interpreter teardown; Qt objects and worker threads are not worth unwinding here
+        sys.stdout.flush()
+        os._exit(0)
+
+    results = run([int(size) for size in args.sizes.split(",")], args.repeat)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    if args.compare:
+        with open(args.compare) as file:
+            if compare(results, json.load(file), args.threshold):
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
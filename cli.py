@@ -0,0 +1,191 @@
+# Command-line access to import, export, reports and backups, without starting Qt
+#
+#   python cli.py import records.xlsx
+#   python cli.py export nightly.csv --start 2024-01-01 --end 2024-12-31
+#   python cli.py export - --search babolat | gzip > babolat.csv.gz
+#   python cli.py export heavy.csv --search "tension:>=60"
+#   python cli.py report "Who Strung" --start 2024-01-01 --end 2024-12-31
+#   python cli.py backup --force
+#   python cli.py sync-export to-main-shop.delta --peer main-shop
+#   python cli.py sync-apply from-station-2.delta
+#
+# `python main.py --cli ...` does the same. Results go to stdout; progress and messages go to stderr.
+import argparse
+import contextlib
+import csv
+import os
+import sys
+from datetime import date
+
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_USAGE = 2  # Also what argparse exits with
+EXIT_REJECTED = 3  # Import finished, but some rows were rejected
+EXIT_INTERRUPTED = 130
+
+
+def run_import(args, output):
+    from import_utils import import_file, InvalidImportFile
+
+    progress = _progress(args, "Importing")
+    try:
+        result = import_file(args.file, progress=progress)
+    except InvalidImportFile as e:
+        print(f"Invalid import file: {e}", file=sys.stderr)
+        return EXIT_USAGE
+    if progress:
+        print(file=sys.stderr)  # End the progress line
+    print(f"{result.imported} records imported", file=output)
+    if result.duplicates:
+        print(f"{result.duplicates} rows skipped because the same record was already stored", file=output)
+    if result.rejected:
+        print(f"{result.rejected} rows rejected because their date could not be read; see {result.error_file}",
+              file=output)
+        return EXIT_REJECTED
+    return EXIT_OK
+
+
+def run_export(args, output):
+    import export_utils
+
+    if args.file == "-":
+        count = export_utils.export_csv_stream(output, args.search, args.start, args.end)
+    else:
+        progress = _progress(args, "Exporting")
+        count = export_utils.export_file(args.file, args.search, args.start, args.end, progress=progress)
+        if progress:
+            print(file=sys.stderr)
+        if not args.quiet:
+            print(f"{count} records exported to {args.file}", file=sys.stderr)
+    return EXIT_OK
+
+
+def run_report(args, output):
+    from data_access import get_repository, REPORT_COLUMNS
+
+    writer = csv.writer(output, delimiter="\t" if args.format == "tsv" else ",")
+    writer.writerow([args.dimension, *REPORT_COLUMNS])
+    writer.writerows(get_repository().report(args.dimension, args.start, args.end))
+    return EXIT_OK
+
+
+def run_backup(args, output):
+    import backup_utils
+
+    backup_file = backup_utils.backup_database_on_launch(include_excel=args.excel, force=args.force)
+    if backup_file:
+        print(backup_file, file=output)
+    return EXIT_OK
+
+
+def run_sync_export(args, output):
+    import sync_utils
+
+    summary = sync_utils.export_delta(args.file, peer=args.peer, since=args.since)
+    print(f"{summary.records} changed and {summary.tombstones} deleted records written to {args.file} "
+          f"(changes {summary.since + 1}-{summary.until})", file=output)
+    return EXIT_OK
+
+
+def run_sync_apply(args, output):
+    import sync_utils
+
+    try:
+        result = sync_utils.apply_delta(args.file)
+    except sync_utils.InvalidDeltaFile as e:
+        print(e, file=sys.stderr)
+        return EXIT_USAGE
+    print(", ".join(f"{count} {name}" for name, count in result._asdict().items()), file=output)
+    return EXIT_OK
+
+
+def _progress(args, verb):
+    """Return a progress callback writing percentages to stderr, or None when quiet or not a terminal."""
+    if args.quiet or not sys.stderr.isatty():
+        return None
+    return lambda percent: print(f"\r{verb}... {percent}%", end="", file=sys.stderr, flush=True)
+
+
+def _iso_date(text):
+    try:
+        return date.fromisoformat(text).isoformat()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM-DD, got {text!r}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description="Stringing tracker without the GUI")
+    parser.add_argument("--db", help="database file (default: STRINGING_DB or stringing.db next to the app)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="no progress or status messages on stderr")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser("import", help="import records from a CSV or Excel file")
+    import_parser.add_argument("file")
+    import_parser.set_defaults(run=run_import)
+
+    export_parser = commands.add_parser("export", help="export records to a CSV or Excel file, or CSV on stdout")
+    export_parser.add_argument("file", help=".csv or .xlsx path, or - for CSV on stdout")
+    export_parser.add_argument("--search", help="only records matching this search text")
+    export_parser.add_argument("--start", type=_iso_date, help="first date strung, YYYY-MM-DD (needs --end)")
+    export_parser.add_argument("--end", type=_iso_date, help="last date strung, YYYY-MM-DD (needs --start)")
+    export_parser.set_defaults(run=run_export)
+
+    # Same groupings as the Generate Report dialog; kept literal so --help works without opening the database
+    report_parser = commands.add_parser("report",
+                                        help="count rackets strung between two dates, with tension statistics")
+    report_parser.add_argument("dimension", choices=["Who Strung", "String", "Racket", "Month", "Customer"])
+    report_parser.add_argument("--start", type=_iso_date, required=True, help="YYYY-MM-DD")
+    report_parser.add_argument("--end", type=_iso_date, required=True, help="YYYY-MM-DD")
+    report_parser.add_argument("--format", choices=["csv", "tsv"], default="csv")
+    report_parser.set_defaults(run=run_report)
+
+    backup_parser = commands.add_parser("backup", help="make a compressed database backup if one is due")
+    backup_parser.add_argument("--force", action="store_true", help="back up even if a recent backup exists")
+    backup_parser.add_argument("--excel", action="store_true", help="also refresh the Excel backup")
+    backup_parser.set_defaults(run=run_backup)
+
+    sync_export_parser = commands.add_parser("sync-export", help="write the changes another station hasn't seen")
+    sync_export_parser.add_argument("file")
+    sync_export_parser.add_argument("--peer", help="station the delta is for; only changes not yet sent to it")
+    sync_export_parser.add_argument("--since", type=int, help="changes after this sequence number (default: all)")
+    sync_export_parser.set_defaults(run=run_sync_export)
+
+    sync_apply_parser = commands.add_parser("sync-apply", help="merge a delta from another station")
+    sync_apply_parser.add_argument("file")
+    sync_apply_parser.set_defaults(run=run_sync_apply)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "export" and bool(args.start) != bool(args.end):
+        print("--start and --end must be given together", file=sys.stderr)
+        return EXIT_USAGE
+    if args.db:
+        os.environ["STRINGING_DB"] = os.path.abspath(args.db)  # Read when database_utils is first imported
+
+    output = sys.stdout
+    # The app's own status messages use print(); keep them out of the results on stdout
+    messages = open(os.devnull, "w") if args.quiet else sys.stderr
+    try:
+        with contextlib.redirect_stdout(messages):
+            from database_utils import setup_database
+
+            setup_database()
+            return args.run(args, output)
+    except KeyboardInterrupt:
+        return EXIT_INTERRUPTED
+    except BrokenPipeError:
+        # The reader (e.g. `head`) went away; don't let the interpreter complain while flushing stdout
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return EXIT_ERROR
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return EXIT_ERROR
+    finally:
+        if messages is not sys.stderr:
+            messages.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
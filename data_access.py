@@ -0,0 +1,723 @@
+# Shared data access for StringingRecords
+import atexit
+import threading
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from database_utils import connect, build_match_query, normalize_value, parse_tension, record_hash, \
+    search_index_exists, split_tension_filters, utc_timestamp, LOOKUP_COLUMNS, RECORDS_VIEW, SEARCH_TABLE, \
+    SEARCH_COLUMNS
+from profiler import timed
+
+LOOKUP_CACHE_SIZE = 2000  # Most recently used values kept in memory per lookup column
+RECENT_CUSTOMERS = 50  # Customer histories kept in memory
+CUSTOMER_HISTORY_LIMIT = 100  # Records shown per customer history
+IDLE_CONNECTIONS = 4  # Released worker connections kept open for the next worker thread
+
+# Statements are kept as constant strings so sqlite3's statement cache can reuse the compiled form.
+# The trailing date_strung (None when the date couldn't be read) is the rows' sort key; it isn't displayed.
+RECORD_COLUMNS = "id, name, racket, string, tension, COALESCE(date_strung, date_strung_raw), who_strung, date_strung"
+PAGE_ORDER = " ORDER BY date_strung DESC, id DESC LIMIT ?"
+# Keyset paging: a page continues after the (date_strung, id) of the last row loaded, which
+# idx_records_date_strung seeks to directly however deep the page is. Undated rows sort last.
+PAGE_AFTER_DATED = "(date_strung, id) < (?, ?)"
+PAGE_UNDATED = "date_strung IS NULL"
+PAGE_AFTER_UNDATED = "date_strung IS NULL AND id < ?"
+
+# Filters shared by paging and export; search terms go through the full-text index when it exists
+SEARCH_FILTER = f"id IN (SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH ?)"
+# Pages of a filter matching many records walk idx_records_date_strung and check each row on the way: a unary +
+# keeps the planner from reading every match through the filter's own index and sorting them all for one page.
+# At 300k records the two plans cost about the same at 1,500 matches.
+DENSE_MATCHES = 1500
+SEARCH_MATCHES = f"SELECT COUNT(*) FROM (SELECT 1 FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH ? LIMIT ?)"
+TENSION_MATCHES = "SELECT COUNT(*) FROM (SELECT 1 FROM StringingRecords WHERE {condition} LIMIT ?)"
+LIKE_FILTER = "(" + " OR ".join(f"{column} LIKE ?" for column in SEARCH_COLUMNS) + ")"
+DATE_FILTER = "date_strung BETWEEN ? AND ?"
+
+# Writes take lookup ids for racket, string and who_strung, the record's content_hash and its parsed tensions;
+# see RecordRepository._encode. Then comes its occurrence: identical records are numbered 1, 2, ...
+# Every write also stamps the sync columns (uuid, updated_at, version, change_seq); deletes leave a
+# tombstone by trigger.
+INSERT_RECORD = """
+INSERT INTO StringingRecords (name, racket_id, string_id, tension, date_strung, date_strung_raw, stringer_id,
+                              content_hash, tension_main, tension_cross, occurrence, uuid, updated_at, version,
+                              change_seq)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+# Imports skip the n-th copy of a record when n identical records are already stored
+UPSERT_RECORD = """
+INSERT INTO StringingRecords (name, racket_id, string_id, tension, date_strung, date_strung_raw, stringer_id,
+                              content_hash, tension_main, tension_cross, occurrence, uuid, updated_at, version,
+                              change_seq)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (content_hash, occurrence) DO NOTHING
+"""
+UPDATE_RECORD = """
+UPDATE StringingRecords
+SET name = ?, racket_id = ?, string_id = ?, tension = ?, date_strung = ?, date_strung_raw = ?, stringer_id = ?,
+    content_hash = ?, tension_main = ?, tension_cross = ?, occurrence = ?, updated_at = ?, version = version + 1,
+    change_seq = ?
+WHERE id = ?
+"""
+NEXT_OCCURRENCE = "SELECT IFNULL(MAX(occurrence), 0) + 1 FROM StringingRecords WHERE content_hash = ?"
+RECORD_OCCURRENCE = "SELECT content_hash, occurrence FROM StringingRecords WHERE id = ?"
+DELETE_RECORD = "DELETE FROM StringingRecords WHERE id = ?"
+NEXT_CHANGE_SEQ = "UPDATE SyncState SET seq = seq + 1 WHERE id = 1"
+SYNC_STATE = "SELECT seq, station FROM SyncState WHERE id = 1"
+
+# Sync deltas (see sync_utils): records and tombstones changed after a given change_seq
+SYNC_COLUMNS = ["uuid", "version", "updated_at", "name", "racket", "string", "tension", "date_strung",
+                "date_strung_raw", "who_strung"]
+SYNC_FIELDS = SYNC_COLUMNS[3:]  # The record's content
+SYNC_RECORDS = f"SELECT {', '.join(SYNC_COLUMNS)} FROM {RECORDS_VIEW} WHERE change_seq > ? ORDER BY change_seq"
+SYNC_TOMBSTONES = "SELECT uuid, version, deleted_at FROM SyncTombstones WHERE change_seq > ? ORDER BY change_seq"
+SYNC_RECORD = f"SELECT id, {', '.join(SYNC_COLUMNS)} FROM {RECORDS_VIEW} WHERE uuid = ?"
+SYNC_TOMBSTONE = "SELECT version, deleted_at FROM SyncTombstones WHERE uuid = ?"
+APPLY_UPDATE = """
+UPDATE StringingRecords
+SET name = ?, racket_id = ?, string_id = ?, tension = ?, date_strung = ?, date_strung_raw = ?, stringer_id = ?,
+    content_hash = ?, tension_main = ?, tension_cross = ?, occurrence = ?, uuid = ?, updated_at = ?, version = ?,
+    change_seq = ?
+WHERE id = ?
+"""
+APPLY_TOMBSTONE = """
+INSERT INTO SyncTombstones (uuid, version, deleted_at, change_seq) VALUES (?, ?, ?, ?)
+ON CONFLICT (uuid) DO UPDATE SET version = excluded.version, deleted_at = excluded.deleted_at,
+                                 change_seq = excluded.change_seq
+"""
+PEER_SEQ = "SELECT last_seq FROM SyncPeers WHERE peer = ?"
+SET_PEER_SEQ = """
+INSERT INTO SyncPeers (peer, last_seq) VALUES (?, ?)
+ON CONFLICT (peer) DO UPDATE SET last_seq = excluded.last_seq
+"""
+# Columnar snapshot for trend charts (see analytics_utils): days since 1970-01-01 instead of date text
+ANALYTICS_ROWS = """
+SELECT uuid, IFNULL(CAST(julianday(date_strung) - 2440587.5 AS INTEGER), -2147483648), stringer_id, string_id,
+       racket_id, tension_main
+FROM StringingRecords
+WHERE change_seq > ?
+"""
+DELETED_SINCE = "SELECT uuid FROM SyncTombstones WHERE change_seq > ?"
+LOOKUP_NAMES = "SELECT id, name FROM {table}"
+# Served from idx_records_customer without touching the table or sorting
+CUSTOMER_HISTORY = f"""
+SELECT {RECORD_COLUMNS}
+FROM {RECORDS_VIEW}
+WHERE name = ? COLLATE NOCASE
+ORDER BY date_strung DESC, id DESC
+LIMIT ?
+"""
+# Positions of the lookup columns in INSERT_RECORD's (and UPDATE_RECORD's) parameters
+LOOKUP_POSITIONS = {"racket": 1, "string": 2, "who_strung": 6}
+INSERT_LOOKUP = "INSERT OR IGNORE INTO {table} (name) VALUES (?)"
+SELECT_LOOKUP = "SELECT id, name FROM {table} WHERE name = ?"
+RECENT_LOOKUPS = "SELECT id, name FROM {table} ORDER BY id DESC LIMIT ?"
+
+# Report dimensions: label -> a LOOKUP_COLUMNS column or an expression over DailySummary. Customer has
+# about one row per record per day, so rolling it up would not shrink anything; it is grouped from
+# StringingRecords instead.
+REPORT_DIMENSIONS = {
+    "Who Strung": "who_strung",
+    "String": "string",
+    "Racket": "racket",
+    "Month": "substr(day, 1, 7)",
+    "Customer": None,
+}
+# Average and standard deviation of the main tension in lbs, from a count, a sum and a sum of squares of
+# tenths of a lb. Records without a readable tension are left out.
+TENSION_STATISTICS = """
+ROUND({total} / 10.0 / NULLIF({count}, 0), 1) AS tension_average,
+ROUND(sqrt(MAX({squares} * 1.0 / NULLIF({count}, 0) - {mean} * {mean}, 0)) / 10.0, 1) AS tension_deviation"""
+SUMMARY_STATISTICS = TENSION_STATISTICS.format(total="SUM(tension_tenths)", count="SUM(tension_count)",
+                                               squares="SUM(tension_squares)",
+                                               mean="(SUM(tension_tenths) * 1.0 / NULLIF(SUM(tension_count), 0))")
+RECORD_TENTHS = "CAST(ROUND(tension_main * 10) AS INTEGER)"
+RECORD_STATISTICS = TENSION_STATISTICS.format(total=f"SUM({RECORD_TENTHS})", count="COUNT(tension_main)",
+                                              squares=f"SUM({RECORD_TENTHS} * {RECORD_TENTHS})",
+                                              mean=f"(SUM({RECORD_TENTHS}) * 1.0 / NULLIF(COUNT(tension_main), 0))")
+REPORT_COLUMNS = ["Rackets Count", "Avg Tension (lbs)", "Tension Std Dev (lbs)"]  # After the dimension
+# Grouped on the integer ids, then joined to the lookup table for the names
+LOOKUP_REPORT = f"""
+SELECT lookup.name, totals.rackets_count, totals.tension_average, totals.tension_deviation
+FROM (
+    SELECT {{id_column}} AS lookup_id, SUM(rackets_count) AS rackets_count, {SUMMARY_STATISTICS}
+    FROM DailySummary
+    WHERE day BETWEEN ? AND ?
+    GROUP BY {{id_column}}
+) AS totals
+JOIN {{table}} AS lookup ON lookup.id = totals.lookup_id
+ORDER BY totals.rackets_count DESC
+"""
+SUMMARY_REPORT = f"""
+SELECT {{key}} AS report_key, SUM(rackets_count) AS rackets_count, {SUMMARY_STATISTICS}
+FROM DailySummary
+WHERE day BETWEEN ? AND ?
+GROUP BY report_key
+ORDER BY {{order}}
+"""
+CUSTOMER_REPORT = f"""
+SELECT name, COUNT(*) AS rackets_count, {RECORD_STATISTICS}
+FROM StringingRecords
+WHERE date_strung BETWEEN ? AND ?
+GROUP BY name
+ORDER BY rackets_count DESC
+"""
+
+EXPORT_COLUMNS = ["name", "racket", "string", "tension", "date_strung", "who_strung"]
+EXPORT_QUERY = f"""
+SELECT name, racket, string, tension, COALESCE(date_strung, date_strung_raw), who_strung
+FROM {RECORDS_VIEW}
+"""
+COUNT_QUERY = f"SELECT COUNT(*) FROM {RECORDS_VIEW}"
+
+
+class LookupCache:
+    """LRU-bounded map from racket, string and stringer text to lookup-table ids, shared by all threads.
+
+    Besides saving a query per value on writes, it feeds the autocomplete lists in AddEditRecordDialog.
+    """
+
+    def __init__(self, size=LOOKUP_CACHE_SIZE):
+        self.size = size
+        self._entries = {column: OrderedDict() for column in LOOKUP_COLUMNS}  # text -> (id, stored name)
+        self._loaded = set()
+        self._lock = threading.Lock()
+
+    def get(self, column, value):
+        with self._lock:
+            entries = self._entries[column]
+            entry = entries.get(value)
+            if entry is None:
+                return None
+            entries.move_to_end(value)
+            return entry[0]
+
+    def add(self, column, value, lookup_id, name):
+        with self._lock:
+            entries = self._entries[column]
+            entries[value] = (lookup_id, name)
+            entries.move_to_end(value)
+            if len(entries) > self.size:
+                entries.popitem(last=False)
+
+    def load(self, column, rows):
+        """Seed `column` with (id, name) rows, oldest first, unless it has been loaded already."""
+        with self._lock:
+            if column in self._loaded:
+                return
+            # Values used since startup stay the most recent
+            entries = OrderedDict((name, (lookup_id, name)) for lookup_id, name in rows)
+            for value, entry in self._entries[column].items():
+                entries.pop(value, None)
+                entries[value] = entry
+            self._entries[column] = entries
+            while len(entries) > self.size:
+                entries.popitem(last=False)
+            self._loaded.add(column)
+
+    def is_loaded(self, column):
+        return column in self._loaded
+
+    def values(self, column):
+        """Return the distinct stored names for `column`, most recently used first."""
+        with self._lock:
+            names = [name for _, name in reversed(self._entries[column].values())]
+        return list(dict.fromkeys(names))
+
+
+class RecordRepository:
+    """Owns the app's SQLite connections: one per thread while it uses the database.
+
+    Worker threads hand theirs back with release_connection() when their work is done; a few stay
+    open (with their page cache) for the next worker, so thread pool turnover doesn't pile them up.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._local = threading.local()
+        self._connections = []  # Every open connection, in use or idle
+        self._idle = []  # Released connections waiting for another thread
+        self._lock = threading.Lock()
+        self._has_search_index = None
+        self.lookups = LookupCache()
+        self._customers = OrderedDict()  # name -> history rows, least recently used first
+        self._customers_lock = threading.Lock()
+        self._customers_version = 0  # Bumped by every invalidation, so a history read during a write isn't kept
+
+    @property
+    def connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                conn = connect(self.path)
+                with self._lock:
+                    self._connections.append(conn)
+            self._local.conn = conn
+        return conn
+
+    def release_connection(self):
+        """Give up this thread's connection; call it in a finally when a worker thread's work is done.
+
+        Up to IDLE_CONNECTIONS are kept for other threads to pick up, the rest are closed.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            return
+        self._local.conn = None
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")  # Never hand on an open transaction
+        with self._lock:
+            if conn in self._connections and len(self._idle) < IDLE_CONNECTIONS:
+                self._idle.append(conn)
+                return
+            if conn in self._connections:
+                self._connections.remove(conn)
+        try:
+            conn.close()
+        except Exception as e:
+            print(f"Failed to close database connection: {e}")
+
+    def close(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+            self._idle = []
+        for conn in connections:
+            try:
+                conn.close()
+            except Exception as e:
+                print(f"Failed to close database connection: {e}")
+        self._local = threading.local()
+
+    @contextmanager
+    def transaction(self):
+        """Group several writes into one transaction (and one commit) on this thread's connection.
+
+        Nested use joins the transaction already open on this thread.
+        """
+        conn = self.connection
+        if conn.in_transaction:
+            yield conn
+            return
+        # Lookup ids created in this transaction only reach the shared cache once it commits
+        self._local.new_lookups = []
+        self._local.change_seq = None
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            with timed("commit"):
+                conn.execute("COMMIT")
+            for entry in self._local.new_lookups:
+                self.lookups.add(*entry)
+        finally:
+            self._local.new_lookups = None
+            self._local.change_seq = None
+
+    @contextmanager
+    def snapshot(self):
+        """Read several queries from one consistent view of the database, without blocking writers."""
+        conn = self.connection
+        conn.execute("BEGIN")
+        try:
+            yield conn
+        finally:
+            conn.execute("COMMIT")
+
+    def fetch_page(self, search, limit, after=None):
+        """Return up to `limit` records newest first, optionally filtered by `search`.
+
+        `after` is the (date_strung, id) of the last record already loaded; the page continues from there.
+        """
+        label = "search page" if search else "load page"
+        where, params = self._record_filter(search, ordered=True)
+        if after is None:
+            return self._fetch_page(label, where, params, limit)
+        date_strung, record_id = after
+        if date_strung is None:
+            return self._fetch_page(label, where, params, limit, PAGE_AFTER_UNDATED, [record_id])
+        rows = self._fetch_page(label, where, params, limit, PAGE_AFTER_DATED, [date_strung, record_id])
+        if len(rows) < limit:
+            # Past the last dated record; carry on with the undated ones
+            rows += self._fetch_page(label, where, params, limit - len(rows), PAGE_UNDATED)
+        return rows
+
+    def fetch_record(self, record_id, search=""):
+        """Return one record in fetch_page's shape, or None if it no longer exists or `search` excludes it."""
+        where, params = self._record_filter(search)
+        where += " AND id = ?" if where else " WHERE id = ?"
+        rows = self._fetchall("fetch record", f"SELECT {RECORD_COLUMNS} FROM {RECORDS_VIEW}{where}",
+                              params + [record_id])
+        return rows[0] if rows else None
+
+    def customer_history(self, name):
+        """Return the customer's records newest first, in fetch_page's shape, from memory when possible."""
+        history = self.recent_customer(name)
+        if history is None:
+            version = self._customers_version
+            history = self._fetchall("customer history", CUSTOMER_HISTORY, (name, CUSTOMER_HISTORY_LIMIT))
+            with self._customers_lock:
+                if version == self._customers_version:
+                    self._customers[name] = history
+                    if len(self._customers) > RECENT_CUSTOMERS:
+                        self._customers.popitem(last=False)
+        return history
+
+    def recent_customer(self, name):
+        """Return the customer's cached history, or None if it has to be read from the database."""
+        with self._customers_lock:
+            history = self._customers.get(name)
+            if history is not None:
+                self._customers.move_to_end(name)
+            return history
+
+    def insert_record(self, name, racket, string, tension, date_strung, who_strung, date_strung_raw=None):
+        """Insert a record and return its id."""
+        with self.transaction():
+            params = self._encode([(name, racket, string, tension, date_strung, date_strung_raw, who_strung)])[0]
+            params += [self._occurrence(params[7]), uuid.uuid4().hex, utc_timestamp(), 1, self._change_seq()]
+            record_id = self._execute("save: insert", INSERT_RECORD, params).lastrowid
+        self._forget_customers(name)
+        return record_id
+
+    def insert_records(self, rows, seen=None):
+        """Insert (name, racket, string, tension, date_strung, date_strung_raw, who_strung) tuples in one call.
+
+        Identical rows are numbered in the order given, and the n-th copy is skipped when n identical
+        records are already stored, so importing the same rows twice adds nothing the second time. An
+        import spanning several calls passes the same `seen` dict (content_hash -> copies so far) to each.
+        Returns how many rows were inserted.
+        """
+        seen = {} if seen is None else seen
+        with self.transaction():
+            rows = self._encode(rows)
+            updated_at, change_seq = utc_timestamp(), self._change_seq()
+            for row in rows:
+                occurrence = seen[row[7]] = seen.get(row[7], 0) + 1
+                row += [occurrence, uuid.uuid4().hex, updated_at, 1, change_seq]
+            with timed("import: insert batch", UPSERT_RECORD, rows[0] if rows else (), self.connection) as timing:
+                inserted = self.connection.executemany(UPSERT_RECORD, rows).rowcount if rows else 0
+                timing.rows = inserted
+        self._forget_customers()
+        return inserted
+
+    def update_record(self, record_id, name, racket, string, tension, date_strung, who_strung,
+                      date_strung_raw=None):
+        with self.transaction():
+            params = self._encode([(name, racket, string, tension, date_strung, date_strung_raw, who_strung)])[0]
+            params += [self._occurrence(params[7], record_id), utc_timestamp(), self._change_seq(), record_id]
+            self._execute("save: update", UPDATE_RECORD, params)
+        self._forget_customers(name, record_id)
+
+    def delete_record(self, record_id):
+        with self.transaction():
+            self._change_seq()  # Read by the tombstone trigger
+            self._execute("delete", DELETE_RECORD, (record_id,))
+        self._forget_customers(record_id=record_id)
+
+    def sync_state(self):
+        """Return (seq, station): the latest change sequence number and this database's station id."""
+        return self._fetchall("sync: state", SYNC_STATE)[0]
+
+    def changed_records(self, since):
+        """Return a cursor over SYNC_COLUMNS for records changed after change sequence `since`."""
+        return self._execute("sync: changed records", SYNC_RECORDS, (since,))
+
+    def tombstones(self, since):
+        """Return a cursor over (uuid, version, deleted_at) for records deleted after change sequence `since`."""
+        return self._execute("sync: tombstones", SYNC_TOMBSTONES, (since,))
+
+    def peer_seq(self, peer):
+        """Return the change sequence number last exported to `peer`, or 0."""
+        rows = self._fetchall("sync: peer", PEER_SEQ, (peer,))
+        return rows[0][0] if rows else 0
+
+    def set_peer_seq(self, peer, seq):
+        self._execute("sync: peer", SET_PEER_SEQ, (peer, seq))
+
+    def apply_record(self, record):
+        """Merge a record from another station (a dict of SYNC_COLUMNS) and return (outcome, conflict).
+
+        The newer of the two copies wins: higher version, then later updated_at, then (so that stations
+        converge when both stamps tie) the greater content; a deletion wins a tie with an edit. `outcome` is
+        "inserted", "updated", "unchanged", or "kept" when the local copy (or its deletion) wins.
+        `conflict` is True when both stations changed the record since they last agreed. Records are
+        matched by uuid only; one identical to another record here is a separate record, as when saved here.
+        """
+        with self.transaction():
+            rows = self._fetchall("sync: find record", SYNC_RECORD, (record["uuid"],))
+            incoming = self._sync_order(record)
+            fields = [record[column] for column in SYNC_FIELDS]
+            if rows:
+                record_id, local = rows[0][0], dict(zip(SYNC_COLUMNS, rows[0][1:]))
+                current = self._sync_order(local)
+                if incoming == current:
+                    return "unchanged", False  # Already applied, or sent back by the station that received it
+                conflict = record["version"] <= local["version"]
+                if incoming < current:
+                    return "kept", conflict
+                params = self._encode([fields])[0]
+                params += [self._occurrence(params[7], record_id), record["uuid"], record["updated_at"],
+                           record["version"], self._change_seq(), record_id]
+                self._execute("sync: update", APPLY_UPDATE, params)
+                self._forget_customers(record["name"], record_id)
+                return "updated", conflict
+            tombstone = self._fetchall("sync: find tombstone", SYNC_TOMBSTONE, (record["uuid"],))
+            if tombstone:
+                if tuple(tombstone[0]) >= incoming[:2]:
+                    # Deleted here after (or while) the sender last changed it
+                    return "kept", record["version"] >= tombstone[0][0]
+                self._execute("sync: forget tombstone", "DELETE FROM SyncTombstones WHERE uuid = ?",
+                              (record["uuid"],))
+            params = self._encode([fields])[0]
+            params += [self._occurrence(params[7]), record["uuid"], record["updated_at"], record["version"],
+                       self._change_seq()]
+            self._execute("sync: insert", INSERT_RECORD, params)
+            self._forget_customers(record["name"])
+            return "inserted", False
+
+    def apply_tombstone(self, record_uuid, version, deleted_at):
+        """Merge a deletion from another station and return (outcome, conflict), as for apply_record.
+
+        `outcome` is "deleted", "recorded" (no local copy, but the tombstone is kept to pass on),
+        "unchanged", or "kept" when the local copy was changed after the deletion.
+        """
+        with self.transaction():
+            rows = self._fetchall("sync: find record", SYNC_RECORD, (record_uuid,))
+            if rows:
+                record_id, local = rows[0][0], dict(zip(SYNC_COLUMNS, rows[0][1:]))
+                conflict = local["version"] >= version
+                # Strictly older than the local copy; a tie goes to the deletion, as apply_record decides it
+                if (version, deleted_at) < (local["version"], local["updated_at"]):
+                    return "kept", conflict
+                self._change_seq()
+                self._execute("sync: delete", DELETE_RECORD, (record_id,))
+                # The trigger stamped the tombstone with this station's time; keep the original deletion's
+                self._execute("sync: tombstone", APPLY_TOMBSTONE, (record_uuid, version, deleted_at,
+                                                                   self._change_seq()))
+                self._forget_customers(record_id=record_id)
+                return "deleted", conflict
+            tombstone = self._fetchall("sync: find tombstone", SYNC_TOMBSTONE, (record_uuid,))
+            if tombstone and tuple(tombstone[0]) >= (version, deleted_at):
+                return "unchanged", False  # A tombstone holds nothing beyond its stamps
+            self._execute("sync: tombstone", APPLY_TOMBSTONE, (record_uuid, version, deleted_at,
+                                                               self._change_seq()))
+            return "recorded", False
+
+    def analytics_cursor(self, since):
+        """Return a cursor over ANALYTICS_ROWS for records changed after change sequence `since`.
+
+        `day` counts days since 1970-01-01, or is -2**31 when the date could not be read.
+        """
+        return self._execute("analytics: changed records", ANALYTICS_ROWS, (since,))
+
+    def deleted_since(self, since):
+        """Return the uuids of records deleted after change sequence `since`."""
+        return [row[0] for row in self._fetchall("analytics: deletions", DELETED_SINCE, (since,))]
+
+    def lookup_names(self, column):
+        """Return {id: name} for every entry of a LOOKUP_COLUMNS column."""
+        table = LOOKUP_COLUMNS[column][0]
+        return dict(self._fetchall("lookup: names", LOOKUP_NAMES.format(table=table)))
+
+    def report(self, dimension, start_date, end_date):
+        """Return (value, rackets_count, tension_average, tension_deviation) rows for one of REPORT_DIMENSIONS
+        between two YYYY-MM-DD dates.
+
+        The tension statistics are of the main tension in lbs, None when no record has a readable one. Months
+        come back in calendar order, everything else busiest first.
+        """
+        key = REPORT_DIMENSIONS[dimension]
+        if key is None:
+            return self._fetchall("report: Customer", CUSTOMER_REPORT, (start_date, end_date))
+        if key in LOOKUP_COLUMNS:
+            table, id_column = LOOKUP_COLUMNS[key]
+            query = LOOKUP_REPORT.format(table=table, id_column=id_column)
+            return self._fetchall(f"report: {dimension}", query, (start_date, end_date))
+        order = "report_key" if dimension == "Month" else "rackets_count DESC"
+        query = SUMMARY_REPORT.format(key=key, order=order)
+        return self._fetchall(f"report: {dimension}", query, (start_date, end_date))
+
+    def export_cursor(self, search=None, start_date=None, end_date=None):
+        """Return a cursor over EXPORT_COLUMNS for the matching records; read it with fetchmany()."""
+        where, params = self._record_filter(search, start_date, end_date)
+        return self._execute("export: query", EXPORT_QUERY + where, params)
+
+    def count_records(self, search=None, start_date=None, end_date=None):
+        where, params = self._record_filter(search, start_date, end_date)
+        return self._fetchall("count", COUNT_QUERY + where, params)[0][0]
+
+    def change_count(self):
+        """Return the number of writes ever made to StringingRecords (see ChangeCounter)."""
+        return self._fetchall("backup: change count", "SELECT changes FROM ChangeCounter WHERE id = 1")[0][0]
+
+    def lookup_values(self, column):
+        """Return known values of a LOOKUP_COLUMNS column, most recently used first, for autocomplete."""
+        if not self.lookups.is_loaded(column):
+            table = LOOKUP_COLUMNS[column][0]
+            rows = self._fetchall("lookup: load", RECENT_LOOKUPS.format(table=table), (self.lookups.size,))
+            self.lookups.load(column, reversed(rows))
+        return self.lookups.values(column)
+
+    def _forget_customers(self, name=None, record_id=None):
+        """Drop cached histories for `name` and any holding `record_id`; with neither, drop them all."""
+        with self._customers_lock:
+            self._customers_version += 1
+            if name is None and record_id is None:
+                self._customers.clear()
+                return
+            name = name.lower() if name is not None else None
+            for key, history in list(self._customers.items()):
+                if key.lower() == name or any(row[0] == record_id for row in history):
+                    del self._customers[key]
+
+    def _change_seq(self):
+        """Return this transaction's change sequence number, taking the next one on first use."""
+        if self._local.change_seq is None:
+            self._execute("sync: next seq", NEXT_CHANGE_SEQ)
+            self._local.change_seq = self._fetchall("sync: state", SYNC_STATE)[0][0]
+        return self._local.change_seq
+
+    @staticmethod
+    def _sync_order(record):
+        """Return a key ordering copies of a sync record (a dict of SYNC_COLUMNS) the same way on every station.
+
+        Content breaks ties between equal stamps; lookup ids differ between databases, so it is compared as text,
+        ignoring case and extra whitespace as lookup names do (one station may store "Babolat Pure", another
+        "babolat pure").
+        """
+        content = tuple("" if record[column] is None else normalize_value(record[column]).casefold()
+                        for column in SYNC_FIELDS)
+        return record["version"], record["updated_at"], content
+
+    def _occurrence(self, content_hash, record_id=None):
+        """Return the occurrence to store with `content_hash`.
+
+        That is `record_id`'s own when its content is unchanged, else the next after the identical records stored.
+        """
+        if record_id is not None:
+            rows = self._fetchall("save: occurrence", RECORD_OCCURRENCE, (record_id,))
+            if rows and rows[0][0] == content_hash:
+                return rows[0][1]
+        return self._fetchall("save: occurrence", NEXT_OCCURRENCE, (content_hash,))[0][0]
+
+    def _encode(self, rows):
+        """Return INSERT_RECORD parameter lists: lookup columns normalized and swapped for ids, then the
+        content_hash and the main and cross tensions parsed from the tension text.
+
+        Must run inside transaction(), so new lookup entries commit or roll back with the records.
+        """
+        rows = [list(row) for row in rows]
+        for column, position in LOOKUP_POSITIONS.items():
+            for row in rows:
+                row[position] = normalize_value(row[position])
+            ids = self._lookup_ids(column, {row[position] for row in rows})
+            for row in rows:
+                row[position] = ids[row[position]]
+        for row in rows:
+            row.append(record_hash(*row))
+            row.extend(parse_tension(row[3]))
+        return rows
+
+    def _lookup_ids(self, column, values):
+        """Return {value: id} for normalized `values`, adding the ones not seen before to the lookup table."""
+        ids = {}
+        missing = []
+        new_lookups = self._local.new_lookups
+        pending = {value: lookup_id for entry_column, value, lookup_id, _ in new_lookups if entry_column == column}
+        for value in values:
+            lookup_id = pending.get(value) or self.lookups.get(column, value)
+            if lookup_id is None:
+                missing.append(value)
+            else:
+                ids[value] = lookup_id
+        if missing:
+            table = LOOKUP_COLUMNS[column][0]
+            with timed("lookup: add values") as timing:
+                self.connection.executemany(INSERT_LOOKUP.format(table=table), [(value,) for value in missing])
+                select = SELECT_LOOKUP.format(table=table)
+                for value in missing:
+                    lookup_id, name = self.connection.execute(select, (value,)).fetchone()
+                    ids[value] = lookup_id
+                    new_lookups.append((column, value, lookup_id, name))
+                timing.rows = len(missing)
+        return ids
+
+    def _fetch_page(self, label, where, params, limit, keyset=None, keyset_params=()):
+        if keyset:
+            where += f" AND {keyset}" if where else f" WHERE {keyset}"
+            params = params + list(keyset_params)
+        query = f"SELECT {RECORD_COLUMNS} FROM {RECORDS_VIEW}{where}{PAGE_ORDER}"
+        return self._fetchall(label, query, params + [limit])
+
+    def _execute(self, label, sql, params=()):
+        with timed(label, sql, params, self.connection):
+            return self.connection.execute(sql, params)
+
+    def _fetchall(self, label, sql, params=()):
+        with timed(label, sql, params, self.connection) as timing:
+            rows = self.connection.execute(sql, params).fetchall()
+            timing.rows = len(rows)
+        return rows
+
+    def _record_filter(self, search=None, start_date=None, end_date=None, ordered=False):
+        """Build the WHERE clause and parameters selecting records by search text and/or date range.
+
+        Terms like "tension:50-55" in the search text filter on the parsed tensions; see split_tension_filters.
+        `ordered` is for queries in date order (paging): filters matching at least DENSE_MATCHES records are
+        then checked along idx_records_date_strung instead of driving the query.
+        """
+        clauses = []
+        params = []
+        search, tension_filters = split_tension_filters(search or "")
+        match_query = build_match_query(search)
+        if match_query and self._search_index_available():
+            # Prefix match on name, racket, string and who_strung through the full-text index
+            dense = ordered and self._count_matches(SEARCH_MATCHES, [match_query]) >= DENSE_MATCHES
+            clauses.append("+" + SEARCH_FILTER if dense else SEARCH_FILTER)
+            params.append(match_query)
+        elif search:
+            clauses.append(LIKE_FILTER)
+            params.extend([f"%{search}%"] * len(SEARCH_COLUMNS))
+        for column, operator, values in tension_filters:
+            # tension_main ranges matching few records are served by idx_records_tension
+            condition = f"{column} BETWEEN ? AND ?" if operator == "BETWEEN" else f"{column} {operator} ?"
+            if ordered and self._count_matches(TENSION_MATCHES.format(condition=condition), values) >= DENSE_MATCHES:
+                condition = "+" + condition
+            clauses.append(condition)
+            params.extend(values)
+        if start_date and end_date:
+            clauses.append(DATE_FILTER)
+            params.extend([start_date, end_date])
+        if not clauses:
+            return "", params
+        return " WHERE " + " AND ".join(clauses), params
+
+    def _count_matches(self, sql, params):
+        """Return how many records a filter matches, counting no further than DENSE_MATCHES."""
+        return self._fetchall("search: count matches", sql, params + [DENSE_MATCHES])[0][0]
+
+    def _search_index_available(self):
+        if self._has_search_index is None:
+            self._has_search_index = search_index_exists(self.connection.cursor())
+        return self._has_search_index
+
+
+_repository = None
+_repository_lock = threading.Lock()
+
+
+def get_repository():
+    """Return the process-wide RecordRepository, creating it on first use."""
+    global _repository
+    with _repository_lock:
+        if _repository is None:
+            _repository = RecordRepository()
+            atexit.register(_repository.close)
+        return _repository
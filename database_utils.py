@@ -1,10 +1,71 @@
 # Database Setup
+import hashlib
+import math
+import os
+import re
 import sqlite3
+from datetime import datetime, timezone
+from functools import lru_cache
+
+from profiler import timed
+
+# The database lives next to the application unless STRINGING_DB points elsewhere
+DATABASE_PATH = os.environ.get("STRINGING_DB") or os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                                "stringing.db")
+
+SEARCH_TABLE = "StringingRecordsSearch"
+SEARCH_COLUMNS = ["name", "racket", "string", "who_strung"]
+
+# Columns stored as ids into a lookup table of distinct values: column -> (lookup table, id column).
+# RECORDS_VIEW joins them back, so reads see the same columns as before.
+LOOKUP_COLUMNS = {
+    "racket": ("Rackets", "racket_id"),
+    "string": ("Strings", "string_id"),
+    "who_strung": ("Stringers", "stringer_id"),
+}
+RECORDS_VIEW = "StringingRecordsView"
+
+# UTC, millisecond precision, so timestamps from different stations compare as text
+SQL_TIMESTAMP = "strftime('%Y-%m-%dT%H:%M:%fZ', 'now')"
+
+# Formats accepted for dates coming from older databases and imported files, tried in order
+DATE_FORMATS = ["%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%m/%d/%Y", "%m/%d/%y", "%Y/%m/%d", "%d.%m.%Y"]
+
+# Tensions are stored as text as entered, and parsed into tension_main/tension_cross in lbs
+KG_TO_LBS = 2.20462
+MAX_TENSION_LBS = 150  # Anything above is a typo, e.g. "5553" for 55/53
+TENSION_NUMBER = re.compile(r"\d+(?:[.,]\d+)?")
+TENSION_PERCENTAGE = re.compile(r"\d+(?:[.,]\d+)?\s*%")  # Pre-stretch, not a tension
+# Search terms such as "tension:50-55", "cross:>=52" or "tension:24kg"; see split_tension_filters
+TENSION_FILTER = re.compile(r"\b(tension|cross):\s*(<=|>=|<|>)?\s*(\d+(?:[.,]\d+)?)(?:\s*-\s*(\d+(?:[.,]\d+)?))?"
+                            r"\s*(kg|lbs?)?(?!\w)", re.IGNORECASE)
+
+
+def connect(path=None):
+    """Open a connection in autocommit mode with the pragmas the app relies on.
+
+    Statements commit on their own unless wrapped in an explicit BEGIN ... COMMIT.
+    """
+    conn = sqlite3.connect(path or DATABASE_PATH, timeout=5.0, isolation_level=None, cached_statements=256,
+                           check_same_thread=False)
+    conn.execute("PRAGMA journal_mode = WAL")  # Readers no longer block the writer, one fsync per checkpoint
+    conn.execute("PRAGMA synchronous = NORMAL")  # Safe with WAL; skips the fsync on every commit
+    conn.execute("PRAGMA temp_store = MEMORY")
+    conn.execute("PRAGMA cache_size = -16000")  # 16 MB page cache
+    conn.execute("PRAGMA mmap_size = 268435456")
+    try:
+        conn.execute("SELECT sqrt(1)")
+    except sqlite3.OperationalError:
+        # SQLite built without its math functions; reports need sqrt for the tension spread
+        conn.create_function("sqrt", 1, lambda value: None if value is None else math.sqrt(value),
+                             deterministic=True)
+    return conn
 
 
 def setup_database():
-    conn = sqlite3.connect("stringing.db")
+    conn = connect()
     cursor = conn.cursor()
+    # Version 0 layout; the migrations below bring it up to date
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS StringingRecords (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -15,5 +76,639 @@ def setup_database():
         date_strung TEXT NOT NULL,
         who_strung TEXT NOT NULL
     )""")
-    conn.commit()
-    conn.close()
\ No newline at end of file
+    migrate(cursor)
+    cursor.execute("BEGIN")
+    setup_search_index(cursor)
+    cursor.execute("COMMIT")
+    conn.close()
+
+
+def migrate(cursor):
+    """Apply every migration newer than the database's PRAGMA user_version, each in its own transaction."""
+    version = cursor.execute("PRAGMA user_version").fetchone()[0]
+    for target_version, migration in enumerate(MIGRATIONS, start=1):
+        if target_version <= version:
+            continue
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            with timed(f"migration {target_version}"):
+                migration(cursor)
+            cursor.execute(f"PRAGMA user_version = {target_version}")
+            cursor.execute("COMMIT")
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+        print(f"Database migrated to version {target_version}")
+
+
+def parse_date(text):
+    """Return `text` as a YYYY-MM-DD string, or None if it is not a date in any of DATE_FORMATS."""
+    text = str(text).strip()
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    return None
+
+
+def utc_timestamp():
+    """Return the current time in the same format as SQL_TIMESTAMP."""
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+@lru_cache(maxsize=4096)
+def parse_tension(text):
+    """Return (main, cross) in lbs from "55", "55/53", "24 kg", "23/22 kg" and the like, or (None, None).
+
+    A single value is used for both. Values are rounded to 0.1 lb; pre-stretch percentages are ignored.
+    """
+    text = TENSION_PERCENTAGE.sub("", str(text)).lower()
+    numbers = [float(number.replace(",", ".")) for number in TENSION_NUMBER.findall(text)]
+    if not 1 <= len(numbers) <= 2:
+        return None, None
+    factor = KG_TO_LBS if "kg" in text else 1
+    main, cross = [round(number * factor, 1) for number in (numbers * 2)[:2]]
+    if not (0 < main <= MAX_TENSION_LBS and 0 < cross <= MAX_TENSION_LBS):
+        return None, None
+    return main, cross
+
+
+def split_tension_filters(text):
+    """Take tension range terms out of search text and return (rest of the text, [(column, operator, values)]).
+
+    "babolat tension:50-55" gives ("babolat", [("tension_main", "BETWEEN", [50.0, 55.0])]). A bare value
+    matches exactly; "kg" converts to lbs like parse_tension.
+    """
+    filters = []
+    for match in TENSION_FILTER.finditer(text):
+        field, operator, low, high, unit = match.groups()
+        factor = KG_TO_LBS if unit and unit.lower() == "kg" else 1
+        values = [round(float(value.replace(",", ".")) * factor, 1) for value in (low, high) if value]
+        column = "tension_main" if field.lower() == "tension" else "tension_cross"
+        if len(values) == 2:
+            filters.append((column, "BETWEEN", sorted(values)))
+        else:
+            filters.append((column, operator or "=", values))
+    return TENSION_FILTER.sub(" ", text).strip(), filters
+
+
+def normalize_value(value):
+    """Trim and collapse whitespace, so "Babolat  RPM " and "Babolat RPM" share a lookup entry."""
+    return " ".join(str(value).split())
+
+
+def record_hash(name, racket_id, string_id, tension, date_strung, date_strung_raw, stringer_id):
+    """Return a 16-byte digest of a record's normalized content; identical records share it.
+
+    Name and tension ignore case and extra whitespace (lookup ids already do). Only used to tell
+    duplicates apart on this station, since lookup ids differ between databases.
+    """
+    fields = [normalize_value(name).casefold(), str(racket_id), str(string_id), normalize_value(tension).casefold(),
+              date_strung or normalize_value(date_strung_raw or ""), str(stringer_id)]
+    return hashlib.blake2b("\x1f".join(fields).encode("utf-8"), digest_size=16).digest()
+
+
+def _migrate_typed_dates(cursor):
+    """Store date_strung as YYYY-MM-DD (or NULL) so it sorts and indexes without date().
+
+    Values no format in DATE_FORMATS understands are kept verbatim in date_strung_raw.
+    """
+    cursor.connection.create_function("parse_date", 1, parse_date, deterministic=True)
+    sequence = cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'StringingRecords'").fetchone()
+    cursor.execute("""
+    CREATE TABLE StringingRecords_new (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        racket TEXT NOT NULL,
+        string TEXT NOT NULL,
+        tension TEXT NOT NULL,
+        date_strung TEXT CHECK (date_strung IS NULL OR date_strung = date(date_strung)),
+        date_strung_raw TEXT,
+        who_strung TEXT NOT NULL
+    )""")
+    cursor.execute("""
+    INSERT INTO StringingRecords_new (id, name, racket, string, tension, date_strung, date_strung_raw, who_strung)
+    SELECT id, name, racket, string, tension, parsed, CASE WHEN parsed IS NULL THEN date_strung END, who_strung
+    FROM (
+        -- Values already in YYYY-MM-DD skip the round trip through Python
+        SELECT *, CASE WHEN date_strung = date(date_strung) THEN date_strung ELSE parse_date(date_strung) END AS parsed
+        FROM StringingRecords
+    )
+    """)
+    malformed = cursor.execute(
+        "SELECT COUNT(*) FROM StringingRecords_new WHERE date_strung IS NULL").fetchone()[0]
+    if malformed:
+        print(f"{malformed} record(s) have unreadable dates; originals kept in date_strung_raw")
+    cursor.execute("DROP TABLE StringingRecords")
+    cursor.execute("ALTER TABLE StringingRecords_new RENAME TO StringingRecords")
+    if sequence:
+        # Keep AUTOINCREMENT from handing out ids of records deleted before the migration
+        cursor.execute("DELETE FROM sqlite_sequence WHERE name = 'StringingRecords'")
+        cursor.execute("""
+        INSERT INTO sqlite_sequence (name, seq)
+        SELECT 'StringingRecords', MAX(?, IFNULL(MAX(id), 0)) FROM StringingRecords
+        """, (sequence[0],))
+    cursor.execute("CREATE INDEX idx_records_date_strung ON StringingRecords (date_strung)")
+    cursor.execute("CREATE INDEX idx_records_who_strung ON StringingRecords (who_strung, date_strung)")
+    cursor.execute("CREATE INDEX idx_records_name ON StringingRecords (name COLLATE NOCASE)")
+
+
+def _migrate_change_counter(cursor):
+    """Count every write to StringingRecords so backups can tell when nothing has changed."""
+    cursor.execute("""
+    CREATE TABLE ChangeCounter (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        changes INTEGER NOT NULL
+    )""")
+    cursor.execute("INSERT INTO ChangeCounter (id, changes) VALUES (1, 0)")
+    _create_change_triggers(cursor)
+
+
+def _create_change_triggers(cursor):
+    for event in ["INSERT", "UPDATE", "DELETE"]:
+        cursor.execute(f"""
+        CREATE TRIGGER StringingRecords_count_{event.lower()} AFTER {event} ON StringingRecords BEGIN
+            UPDATE ChangeCounter SET changes = changes + 1 WHERE id = 1;
+        END""")
+
+
+def _migrate_summaries(cursor):
+    """Add DailySummary, a per day x stringer x string x racket count kept current by triggers."""
+    cursor.execute("""
+    CREATE TABLE DailySummary (
+        day TEXT NOT NULL,
+        who_strung TEXT NOT NULL,
+        string TEXT NOT NULL,
+        racket TEXT NOT NULL,
+        rackets_count INTEGER NOT NULL,
+        PRIMARY KEY (day, who_strung, string, racket)
+    ) WITHOUT ROWID""")
+    add_to_summary = """
+        INSERT INTO DailySummary (day, who_strung, string, racket, rackets_count)
+        VALUES (new.date_strung, new.who_strung, new.string, new.racket, 1)
+        ON CONFLICT (day, who_strung, string, racket) DO UPDATE SET rackets_count = rackets_count + 1;"""
+    remove_from_summary = """
+        UPDATE DailySummary SET rackets_count = rackets_count - 1
+        WHERE day = old.date_strung AND who_strung = old.who_strung AND string = old.string AND racket = old.racket;
+        DELETE FROM DailySummary
+        WHERE day = old.date_strung AND who_strung = old.who_strung AND string = old.string AND racket = old.racket
+          AND rackets_count <= 0;"""
+    # Records with unreadable dates (NULL date_strung) are left out, as they are from date-range reports
+    cursor.execute(f"""
+    CREATE TRIGGER StringingRecords_summary_insert AFTER INSERT ON StringingRecords
+    WHEN new.date_strung IS NOT NULL BEGIN {add_to_summary}
+    END""")
+    cursor.execute(f"""
+    CREATE TRIGGER StringingRecords_summary_delete AFTER DELETE ON StringingRecords
+    WHEN old.date_strung IS NOT NULL BEGIN {remove_from_summary}
+    END""")
+    cursor.execute(f"""
+    CREATE TRIGGER StringingRecords_summary_update_old AFTER UPDATE OF date_strung, who_strung, string, racket
+    ON StringingRecords WHEN old.date_strung IS NOT NULL BEGIN {remove_from_summary}
+    END""")
+    cursor.execute(f"""
+    CREATE TRIGGER StringingRecords_summary_update_new AFTER UPDATE OF date_strung, who_strung, string, racket
+    ON StringingRecords WHEN new.date_strung IS NOT NULL BEGIN {add_to_summary}
+    END""")
+    cursor.execute("""
+    INSERT INTO DailySummary (day, who_strung, string, racket, rackets_count)
+    SELECT date_strung, who_strung, string, racket, COUNT(*)
+    FROM StringingRecords
+    WHERE date_strung IS NOT NULL
+    GROUP BY date_strung, who_strung, string, racket
+    """)
+
+
+def _migrate_lookup_tables(cursor):
+    """Move racket, string and who_strung into lookup tables and keep only their integer ids per record.
+
+    Spellings that differ only in case or whitespace become one entry, named after the most used spelling.
+    Rebuilding StringingRecords drops its triggers, so the change counter, summary and search triggers
+    are created again here (the search index by setup_search_index).
+    """
+    sequence = cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'StringingRecords'").fetchone()
+    for column, (table, id_column) in LOOKUP_COLUMNS.items():
+        cursor.execute(f"CREATE TABLE {table} (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE COLLATE NOCASE)")
+        cursor.execute(f"CREATE TEMP TABLE {table}_map (value TEXT PRIMARY KEY, id INTEGER NOT NULL)")
+        values = cursor.execute(
+            f"SELECT {column} FROM StringingRecords GROUP BY {column} ORDER BY COUNT(*) DESC").fetchall()
+        for (value,) in values:
+            name = normalize_value(value)
+            cursor.execute(f"INSERT OR IGNORE INTO {table} (name) VALUES (?)", (name,))
+            cursor.execute(f"INSERT INTO temp.{table}_map (value, id) SELECT ?, id FROM {table} WHERE name = ?",
+                           (value, name))
+    cursor.execute("""
+    CREATE TABLE StringingRecords_new (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        racket_id INTEGER NOT NULL REFERENCES Rackets (id),
+        string_id INTEGER NOT NULL REFERENCES Strings (id),
+        tension TEXT NOT NULL,
+        date_strung TEXT CHECK (date_strung IS NULL OR date_strung = date(date_strung)),
+        date_strung_raw TEXT,
+        stringer_id INTEGER NOT NULL REFERENCES Stringers (id)
+    )""")
+    cursor.execute("""
+    INSERT INTO StringingRecords_new (id, name, racket_id, string_id, tension, date_strung, date_strung_raw,
+                                      stringer_id)
+    SELECT r.id, r.name, rackets.id, strings.id, r.tension, r.date_strung, r.date_strung_raw, stringers.id
+    FROM StringingRecords r
+    JOIN temp.Rackets_map rackets ON rackets.value = r.racket
+    JOIN temp.Strings_map strings ON strings.value = r.string
+    JOIN temp.Stringers_map stringers ON stringers.value = r.who_strung
+    """)
+    for table, _ in LOOKUP_COLUMNS.values():
+        cursor.execute(f"DROP TABLE temp.{table}_map")
+    cursor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")  # Recreated over the view by setup_search_index
+    cursor.execute("DROP TABLE StringingRecords")
+    cursor.execute("ALTER TABLE StringingRecords_new RENAME TO StringingRecords")
+    if sequence:
+        cursor.execute("DELETE FROM sqlite_sequence WHERE name = 'StringingRecords'")
+        cursor.execute("""
+        INSERT INTO sqlite_sequence (name, seq)
+        SELECT 'StringingRecords', MAX(?, IFNULL(MAX(id), 0)) FROM StringingRecords
+        """, (sequence[0],))
+    cursor.execute("CREATE INDEX idx_records_date_strung ON StringingRecords (date_strung)")
+    cursor.execute("CREATE INDEX idx_records_stringer ON StringingRecords (stringer_id, date_strung)")
+    cursor.execute("CREATE INDEX idx_records_name ON StringingRecords (name COLLATE NOCASE)")
+    cursor.execute(f"""
+    CREATE VIEW {RECORDS_VIEW} AS
+    SELECT r.id, r.name, rackets.name AS racket, strings.name AS string, r.tension, r.date_strung,
+           r.date_strung_raw, stringers.name AS who_strung
+    FROM StringingRecords r
+    JOIN Rackets rackets ON rackets.id = r.racket_id
+    JOIN Strings strings ON strings.id = r.string_id
+    JOIN Stringers stringers ON stringers.id = r.stringer_id""")
+    _create_change_triggers(cursor)
+
+    # Summaries keyed by ids too, so reports group on integers
+    cursor.execute("DROP TABLE DailySummary")
+    cursor.execute("""
+    CREATE TABLE DailySummary (
+        day TEXT NOT NULL,
+        stringer_id INTEGER NOT NULL,
+        string_id INTEGER NOT NULL,
+        racket_id INTEGER NOT NULL,
+        rackets_count INTEGER NOT NULL,
+        PRIMARY KEY (day, stringer_id, string_id, racket_id)
+    ) WITHOUT ROWID""")
+    add_to_summary = """
+        INSERT INTO DailySummary (day, stringer_id, string_id, racket_id, rackets_count)
+        VALUES (new.date_strung, new.stringer_id, new.string_id, new.racket_id, 1)
+        ON CONFLICT (day, stringer_id, string_id, racket_id) DO UPDATE SET rackets_count = rackets_count + 1;"""
+    old_key = ("day = old.date_strung AND stringer_id = old.stringer_id AND string_id = old.string_id "
+               "AND racket_id = old.racket_id")
+    remove_from_summary = f"""
+        UPDATE DailySummary SET rackets_count = rackets_count - 1 WHERE {old_key};
+        DELETE FROM DailySummary WHERE {old_key} AND rackets_count <= 0;"""
+    cursor.execute(f"""
+    CREATE TRIGGER StringingRecords_summary_insert AFTER INSERT ON StringingRecords
+    WHEN new.date_strung IS NOT NULL BEGIN {add_to_summary}
+    END""")
+    cursor.execute(f"""
+    CREATE TRIGGER StringingRecords_summary_delete AFTER DELETE ON StringingRecords
+    WHEN old.date_strung IS NOT NULL BEGIN {remove_from_summary}
+    END""")
+    cursor.execute(f"""
+    CREATE TRIGGER StringingRecords_summary_update_old AFTER UPDATE OF date_strung, stringer_id, string_id, racket_id
+    ON StringingRecords WHEN old.date_strung IS NOT NULL BEGIN {remove_from_summary}
+    END""")
+    cursor.execute(f"""
+    CREATE TRIGGER StringingRecords_summary_update_new AFTER UPDATE OF date_strung, stringer_id, string_id, racket_id
+    ON StringingRecords WHEN new.date_strung IS NOT NULL BEGIN {add_to_summary}
+    END""")
+    cursor.execute("""
+    INSERT INTO DailySummary (day, stringer_id, string_id, racket_id, rackets_count)
+    SELECT date_strung, stringer_id, string_id, racket_id, COUNT(*)
+    FROM StringingRecords
+    WHERE date_strung IS NOT NULL
+    GROUP BY date_strung, stringer_id, string_id, racket_id
+    """)
+
+
+def _migrate_customer_index(cursor):
+    """Replace the plain name index with one that covers a customer's history, newest first."""
+    cursor.execute("DROP INDEX IF EXISTS idx_records_name")
+    cursor.execute("""
+    CREATE INDEX idx_records_customer ON StringingRecords (
+        name COLLATE NOCASE, date_strung, id, racket_id, string_id, tension, date_strung_raw, stringer_id
+    )""")
+
+
+def _migrate_sync_tracking(cursor):
+    """Give every record a stable uuid, a version and an updated_at, and keep tombstones of deleted ones.
+
+    change_seq orders local changes (SyncState.seq is bumped once per writing transaction) so a delta
+    holds only what changed since the last one sent to a peer; see sync_utils.
+    """
+    for column in ["uuid TEXT", "updated_at TEXT", "version INTEGER NOT NULL DEFAULT 1",
+                   "change_seq INTEGER NOT NULL DEFAULT 0"]:
+        cursor.execute(f"ALTER TABLE StringingRecords ADD COLUMN {column}")
+    cursor.execute(f"""
+    UPDATE StringingRecords SET uuid = lower(hex(randomblob(16))), updated_at = {SQL_TIMESTAMP}, change_seq = 1
+    """)
+    cursor.execute("CREATE UNIQUE INDEX idx_records_uuid ON StringingRecords (uuid)")
+    cursor.execute("CREATE INDEX idx_records_change_seq ON StringingRecords (change_seq)")
+    cursor.execute("""
+    CREATE TABLE SyncState (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        seq INTEGER NOT NULL,
+        station TEXT NOT NULL
+    )""")
+    cursor.execute("INSERT INTO SyncState (id, seq, station) VALUES (1, 1, lower(hex(randomblob(8))))")
+    cursor.execute("""
+    CREATE TABLE SyncPeers (
+        peer TEXT PRIMARY KEY,
+        last_seq INTEGER NOT NULL
+    ) WITHOUT ROWID""")
+    cursor.execute("""
+    CREATE TABLE SyncTombstones (
+        uuid TEXT PRIMARY KEY,
+        version INTEGER NOT NULL,
+        deleted_at TEXT NOT NULL,
+        change_seq INTEGER NOT NULL
+    ) WITHOUT ROWID""")
+    cursor.execute("CREATE INDEX idx_tombstones_change_seq ON SyncTombstones (change_seq)")
+    cursor.execute(f"""
+    CREATE TRIGGER StringingRecords_tombstone AFTER DELETE ON StringingRecords BEGIN
+        INSERT INTO SyncTombstones (uuid, version, deleted_at, change_seq)
+        VALUES (old.uuid, old.version + 1, {SQL_TIMESTAMP}, (SELECT seq FROM SyncState WHERE id = 1))
+        ON CONFLICT (uuid) DO UPDATE SET version = excluded.version, deleted_at = excluded.deleted_at,
+                                         change_seq = excluded.change_seq;
+    END""")
+    cursor.execute(f"DROP VIEW {RECORDS_VIEW}")
+    cursor.execute(f"""
+    CREATE VIEW {RECORDS_VIEW} AS
+    SELECT r.id, r.name, rackets.name AS racket, strings.name AS string, r.tension, r.date_strung,
+           r.date_strung_raw, stringers.name AS who_strung, r.uuid, r.updated_at, r.version, r.change_seq
+    FROM StringingRecords r
+    JOIN Rackets rackets ON rackets.id = r.racket_id
+    JOIN Strings strings ON strings.id = r.string_id
+    JOIN Stringers stringers ON stringers.id = r.stringer_id""")
+
+
+def _migrate_content_hash(cursor):
+    """Add content_hash, the digest imports use to recognize records already stored (see record_hash).
+
+    Identical records are real: a customer's two rackets strung the same way on the same day. They are
+    numbered 1, 2, ... in `occurrence`, and an import skips a file's n-th copy of a record only when n
+    copies are already stored (see insert_records). Triggers keep each set numbered without gaps as
+    records are deleted or edited.
+    """
+    cursor.connection.create_function("record_hash", 7, record_hash, deterministic=True)
+    cursor.execute("ALTER TABLE StringingRecords ADD COLUMN content_hash BLOB")
+    cursor.execute("ALTER TABLE StringingRecords ADD COLUMN occurrence INTEGER NOT NULL DEFAULT 1")
+    cursor.execute("""
+    UPDATE StringingRecords
+    SET content_hash = record_hash(name, racket_id, string_id, tension, date_strung, date_strung_raw, stringer_id)
+    """)
+    # Only needed to number the existing records; the unique index below serves lookups from then on
+    cursor.execute("CREATE INDEX temp_records_content_hash ON StringingRecords (content_hash, id)")
+    cursor.execute("""
+    UPDATE StringingRecords
+    SET occurrence = (SELECT COUNT(*) FROM StringingRecords AS earlier
+                      WHERE earlier.content_hash = StringingRecords.content_hash AND earlier.id <= StringingRecords.id)
+    WHERE EXISTS (SELECT 1 FROM StringingRecords AS earlier
+                  WHERE earlier.content_hash = StringingRecords.content_hash AND earlier.id < StringingRecords.id)
+    """)
+    cursor.execute("DROP INDEX temp_records_content_hash")
+    cursor.execute("CREATE UNIQUE INDEX idx_records_content ON StringingRecords (content_hash, occurrence)")
+    # The last of the set takes the place of the record that left it
+    fill_gap = """
+        UPDATE StringingRecords SET occurrence = old.occurrence
+        WHERE content_hash = old.content_hash AND occurrence > old.occurrence
+          AND occurrence = (SELECT MAX(occurrence) FROM StringingRecords WHERE content_hash = old.content_hash);"""
+    cursor.execute(f"""
+    CREATE TRIGGER StringingRecords_occurrence_delete AFTER DELETE ON StringingRecords BEGIN{fill_gap}
+    END""")
+    cursor.execute(f"""
+    CREATE TRIGGER StringingRecords_occurrence_update AFTER UPDATE OF content_hash ON StringingRecords
+    WHEN old.content_hash IS NOT new.content_hash BEGIN{fill_gap}
+    END""")
+
+
+def _migrate_tension_values(cursor):
+    """Parse tension into tension_main and tension_cross (lbs, see parse_tension) and index them.
+
+    DailySummary gains the count, sum and sum of squares of the main tensions (in tenths of a lb, so the
+    triggers' running totals stay exact) for the averages and spreads in reports.
+    """
+    cursor.connection.create_function("tension_main", 1, lambda text: parse_tension(text)[0], deterministic=True)
+    cursor.connection.create_function("tension_cross", 1, lambda text: parse_tension(text)[1], deterministic=True)
+    for trigger in ["insert", "delete", "update_old", "update_new"]:
+        cursor.execute(f"DROP TRIGGER StringingRecords_summary_{trigger}")
+    for column in ["tension_main REAL", "tension_cross REAL"]:
+        cursor.execute(f"ALTER TABLE StringingRecords ADD COLUMN {column}")
+    cursor.execute("""
+    UPDATE StringingRecords SET tension_main = tension_main(tension), tension_cross = tension_cross(tension)
+    """)
+    cursor.execute("CREATE INDEX idx_records_tension ON StringingRecords (tension_main, tension_cross)")
+    cursor.execute(f"DROP VIEW {RECORDS_VIEW}")
+    cursor.execute(f"""
+    CREATE VIEW {RECORDS_VIEW} AS
+    SELECT r.id, r.name, rackets.name AS racket, strings.name AS string, r.tension, r.date_strung,
+           r.date_strung_raw, stringers.name AS who_strung, r.uuid, r.updated_at, r.version, r.change_seq,
+           r.tension_main, r.tension_cross
+    FROM StringingRecords r
+    JOIN Rackets rackets ON rackets.id = r.racket_id
+    JOIN Strings strings ON strings.id = r.string_id
+    JOIN Stringers stringers ON stringers.id = r.stringer_id""")
+
+    for column in ["tension_count", "tension_tenths", "tension_squares"]:
+        cursor.execute(f"ALTER TABLE DailySummary ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0")
+    tenths = "CAST(ROUND({row}.tension_main * 10) AS INTEGER)"
+    new_tenths, old_tenths = tenths.format(row="new"), tenths.format(row="old")
+    add_to_summary = f"""
+        INSERT INTO DailySummary (day, stringer_id, string_id, racket_id, rackets_count, tension_count,
+                                  tension_tenths, tension_squares)
+        VALUES (new.date_strung, new.stringer_id, new.string_id, new.racket_id, 1, new.tension_main IS NOT NULL,
+                IFNULL({new_tenths}, 0), IFNULL({new_tenths} * {new_tenths}, 0))
+        ON CONFLICT (day, stringer_id, string_id, racket_id) DO UPDATE SET
+            rackets_count = rackets_count + 1, tension_count = tension_count + excluded.tension_count,
+            tension_tenths = tension_tenths + excluded.tension_tenths,
+            tension_squares = tension_squares + excluded.tension_squares;"""
+    old_key = ("day = old.date_strung AND stringer_id = old.stringer_id AND string_id = old.string_id "
+               "AND racket_id = old.racket_id")
+    remove_from_summary = f"""
+        UPDATE DailySummary
+        SET rackets_count = rackets_count - 1, tension_count = tension_count - (old.tension_main IS NOT NULL),
+            tension_tenths = tension_tenths - IFNULL({old_tenths}, 0),
+            tension_squares = tension_squares - IFNULL({old_tenths} * {old_tenths}, 0)
+        WHERE {old_key};
+        DELETE FROM DailySummary WHERE {old_key} AND rackets_count <= 0;"""
+    summary_columns = "date_strung, stringer_id, string_id, racket_id, tension_main"
+    cursor.execute(f"""
+    CREATE TRIGGER StringingRecords_summary_insert AFTER INSERT ON StringingRecords
+    WHEN new.date_strung IS NOT NULL BEGIN {add_to_summary}
+    END""")
+    cursor.execute(f"""
+    CREATE TRIGGER StringingRecords_summary_delete AFTER DELETE ON StringingRecords
+    WHEN old.date_strung IS NOT NULL BEGIN {remove_from_summary}
+    END""")
+    cursor.execute(f"""
+    CREATE TRIGGER StringingRecords_summary_update_old AFTER UPDATE OF {summary_columns}
+    ON StringingRecords WHEN old.date_strung IS NOT NULL BEGIN {remove_from_summary}
+    END""")
+    cursor.execute(f"""
+    CREATE TRIGGER StringingRecords_summary_update_new AFTER UPDATE OF {summary_columns}
+    ON StringingRecords WHEN new.date_strung IS NOT NULL BEGIN {add_to_summary}
+    END""")
+    rebuild_summaries(cursor)
+
+
+def rebuild_summaries(cursor):
+    """Recompute DailySummary from StringingRecords."""
+    cursor.execute("DELETE FROM DailySummary")
+    cursor.execute(f"""
+    INSERT INTO DailySummary (day, stringer_id, string_id, racket_id, rackets_count, tension_count, tension_tenths,
+                              tension_squares)
+    {SUMMARY_TOTALS}
+    """)
+
+
+def check_summaries(cursor):
+    """Return the DailySummary rows that disagree with StringingRecords, as (source, row) pairs.
+
+    `source` is "records" for counts StringingRecords has but DailySummary lacks, and "summary" for the reverse.
+    An empty list means the summary is consistent.
+    """
+    actual = SUMMARY_TOTALS
+    stored = ("SELECT day, stringer_id, string_id, racket_id, rackets_count, tension_count, tension_tenths, "
+              "tension_squares FROM DailySummary")
+    mismatches = [("records", row) for row in cursor.execute(f"{actual} EXCEPT {stored}").fetchall()]
+    mismatches += [("summary", row) for row in cursor.execute(f"{stored} EXCEPT {actual}").fetchall()]
+    return mismatches
+
+
+# DailySummary's rows computed from scratch (see _migrate_tension_values)
+SUMMARY_TOTALS = """
+SELECT date_strung, stringer_id, string_id, racket_id, COUNT(*), COUNT(tension_main),
+       IFNULL(SUM(CAST(ROUND(tension_main * 10) AS INTEGER)), 0),
+       IFNULL(SUM(CAST(ROUND(tension_main * 10) AS INTEGER) * CAST(ROUND(tension_main * 10) AS INTEGER)), 0)
+FROM StringingRecords
+WHERE date_strung IS NOT NULL
+GROUP BY date_strung, stringer_id, string_id, racket_id
+"""
+
+def count_duplicates(cursor):
+    """Return how many records are identical to an earlier one (see _migrate_content_hash)."""
+    return cursor.execute("SELECT COUNT(*) FROM StringingRecords WHERE occurrence > 1").fetchone()[0]
+
+
+def remove_duplicates(cursor):
+    """Delete every record identical to an earlier one, keeping the first of each set; return how many.
+
+    Only for cleaning up after the same data was imported twice by hand; identical records are usually
+    genuine repeats. Deletions leave sync tombstones like any other.
+    """
+    cursor.execute("UPDATE SyncState SET seq = seq + 1 WHERE id = 1")  # Read by the tombstone trigger
+    cursor.execute("DELETE FROM StringingRecords WHERE occurrence > 1")
+    return cursor.rowcount
+
+
+# Index i holds the migration that moves a database from user_version i to i + 1
+MIGRATIONS = [
+    _migrate_typed_dates,
+    _migrate_change_counter,
+    _migrate_summaries,
+    _migrate_lookup_tables,
+    _migrate_customer_index,
+    _migrate_sync_tracking,
+    _migrate_content_hash,
+    _migrate_tension_values,
+]
+
+
+def setup_search_index(cursor):
+    """Create the FTS5 index over the searchable columns and the triggers that keep it in sync."""
+    created = not search_index_exists(cursor)
+    columns = ", ".join(SEARCH_COLUMNS)
+    new_values = ", ".join(_search_value("new", column) for column in SEARCH_COLUMNS)
+    old_values = ", ".join(_search_value("old", column) for column in SEARCH_COLUMNS)
+    stored_columns = ", ".join(LOOKUP_COLUMNS[column][1] if column in LOOKUP_COLUMNS else column
+                               for column in SEARCH_COLUMNS)
+    try:
+        cursor.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+            {columns}, content='{RECORDS_VIEW}', content_rowid='id'
+        )""")
+    except sqlite3.OperationalError as e:
+        # SQLite builds without FTS5 fall back to LIKE searches
+        print(f"Full-text search unavailable: {e}")
+        return
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS StringingRecords_search_insert AFTER INSERT ON StringingRecords BEGIN
+        INSERT INTO {SEARCH_TABLE}(rowid, {columns}) VALUES (new.id, {new_values});
+    END""")
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS StringingRecords_search_delete AFTER DELETE ON StringingRecords BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+    END""")
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS StringingRecords_search_update AFTER UPDATE OF {stored_columns} ON StringingRecords
+    BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+        INSERT INTO {SEARCH_TABLE}(rowid, {columns}) VALUES (new.id, {new_values});
+    END""")
+    if created:
+        # Index the records that existed before the search table did
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')")
+
+
+def _search_value(row, column):
+    # Lookup columns are indexed by their text, not their id
+    if column in LOOKUP_COLUMNS:
+        table, id_column = LOOKUP_COLUMNS[column]
+        return f"(SELECT name FROM {table} WHERE id = {row}.{id_column})"
+    return f"{row}.{column}"
+
+
+def search_index_exists(cursor):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (SEARCH_TABLE,))
+    return cursor.fetchone() is not None
+
+
+def build_match_query(text):
+    """Turn free text into an FTS5 query that prefix-matches every word, e.g. 'bab rp' -> '"bab"* "rp"*'."""
+    words = re.findall(r"\w+", text)
+    return " ".join(f'"{word}"*' for word in words)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Stringing database maintenance")
+    parser.add_argument("--rebuild-summaries", action="store_true",
+                        help="recompute the report summary table from the records")
+    parser.add_argument("--check-summaries", action="store_true",
+                        help="compare the report summary table with the records")
+    parser.add_argument("--check-duplicates", action="store_true",
+                        help="count records identical to an earlier record")
+    parser.add_argument("--remove-duplicates", action="store_true",
+                        help="delete records identical to an earlier record, keeping the first of each")
+    args = parser.parse_args()
+
+    setup_database()
+    conn = connect()
+    cursor = conn.cursor()
+    if args.rebuild_summaries:
+        cursor.execute("BEGIN IMMEDIATE")
+        rebuild_summaries(cursor)
+        cursor.execute("COMMIT")
+        print("Report summaries rebuilt")
+    if args.check_summaries:
+        mismatches = check_summaries(cursor)
+        for source, row in mismatches:
+            print(f"Only in {source}: {row}")
+        print(f"{len(mismatches)} mismatched summary row(s)")
+        if mismatches:
+            raise SystemExit(1)
+    if args.check_duplicates:
+        print(f"{count_duplicates(cursor)} record(s) identical to an earlier record")
+    if args.remove_duplicates:
+        cursor.execute("BEGIN IMMEDIATE")
+        removed = remove_duplicates(cursor)
+        cursor.execute("COMMIT")
+        print(f"Removed {removed} duplicate record(s)")
+    conn.close()
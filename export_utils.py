@@ -0,0 +1,126 @@
+# Streaming export of stringing records to CSV and Excel files
+import csv
+import os
+import tempfile
+
+from data_access import get_repository, EXPORT_COLUMNS
+from profiler import timed
+
+CHUNK_ROWS = 5000  # Rows pulled from the cursor per write
+
+
+class ExportCancelled(Exception):
+    """The export was cancelled; no file was written."""
+
+
+def export_file(file_path, search=None, start_date=None, end_date=None, repository=None, progress=None,
+                is_cancelled=None):
+    """Write the matching records to `file_path` (.csv or .xlsx) and return how many were written.
+
+    Rows are streamed from the database CHUNK_ROWS at a time, so memory use does not grow with the
+    table. The file is written under a temporary name and only renamed into place once complete.
+    `search` and `start_date`/`end_date` (YYYY-MM-DD) narrow the export the same way as the main window.
+    """
+    if file_path.endswith(".csv"):
+        writer_class = _CsvWriter
+    elif file_path.endswith(".xlsx"):
+        writer_class = _XlsxWriter
+    else:
+        raise ValueError("Please select a valid file format (CSV or Excel).")
+
+    repository = repository or get_repository()
+    total = repository.count_records(search, start_date, end_date) if progress else 0
+    cursor = repository.export_cursor(search, start_date, end_date)
+    directory = os.path.dirname(os.path.abspath(file_path))
+    handle, temp_path = tempfile.mkstemp(suffix=os.path.splitext(file_path)[1], dir=directory)
+    os.close(handle)
+    written = 0
+    writer = None
+    try:
+        writer = writer_class(temp_path)
+        writer.write_row(EXPORT_COLUMNS)
+        while True:
+            if is_cancelled and is_cancelled():
+                raise ExportCancelled()
+            with timed("export: fetch chunk") as timing:
+                rows = cursor.fetchmany(CHUNK_ROWS)
+                timing.rows = len(rows)
+            if not rows:
+                break
+            with timed("export: write chunk"):
+                writer.write_rows(rows)
+            written += len(rows)
+            if progress:
+                progress(min(100, written * 100 // max(1, total)))
+        with timed("export: save file"):
+            writer.close()
+        os.replace(temp_path, file_path)
+    except BaseException:
+        cursor.close()
+        if writer is not None:
+            writer.discard()
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return written
+
+
+def export_csv_stream(stream, search=None, start_date=None, end_date=None, repository=None):
+    """Write the matching records as CSV to an open text stream (e.g. stdout) and return how many were written."""
+    repository = repository or get_repository()
+    cursor = repository.export_cursor(search, start_date, end_date)
+    writer = csv.writer(stream)
+    writer.writerow(EXPORT_COLUMNS)
+    written = 0
+    try:
+        while True:
+            rows = cursor.fetchmany(CHUNK_ROWS)
+            if not rows:
+                break
+            writer.writerows(rows)
+            written += len(rows)
+    finally:
+        cursor.close()
+    return written
+
+
+class _CsvWriter:
+    def __init__(self, path):
+        self._handle = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._handle)
+
+    def write_row(self, row):
+        self._writer.writerow(row)
+
+    def write_rows(self, rows):
+        self._writer.writerows(rows)
+
+    def close(self):
+        self._handle.close()
+
+    def discard(self):
+        self._handle.close()
+
+
+class _XlsxWriter:
+    """openpyxl write-only workbook: rows are flushed to disk as they are appended."""
+
+    def __init__(self, path):
+        from openpyxl import Workbook
+
+        self._path = path
+        self._workbook = Workbook(write_only=True)
+        self._sheet = self._workbook.create_sheet()
+
+    def write_row(self, row):
+        self._sheet.append(list(row))
+
+    def write_rows(self, rows):
+        for row in rows:
+            self._sheet.append(list(row))
+
+    def close(self):
+        self._workbook.save(self._path)
+
+    def discard(self):
+        pass  # Nothing reaches the file until close()
@@ -0,0 +1,163 @@
+# Bulk import of stringing records from CSV and Excel files
+# pandas and openpyxl are imported inside the functions that use them to keep them out of startup
+import csv
+import os
+import tempfile
+from collections import namedtuple
+from itertools import islice
+
+from data_access import get_repository
+from database_utils import DATE_FORMATS
+from profiler import timed
+
+REQUIRED_COLUMNS = ["Name", "Racket", "String", "Tension", "Date Strung", "Who Strung"]
+MISSING_VALUE = "-no data-"  # Stored in place of empty cells
+CHUNK_ROWS = 5000  # Rows parsed and inserted per batch
+
+ImportResult = namedtuple("ImportResult", ["imported", "duplicates", "rejected", "error_file"])
+
+
+class InvalidImportFile(Exception):
+    """The file is not a CSV/Excel file or lacks one of REQUIRED_COLUMNS."""
+
+
+class ImportCancelled(Exception):
+    """The import was cancelled; nothing from it was committed."""
+
+
+def import_file(file_path, repository=None, progress=None, is_cancelled=None):
+    """Import every row of `file_path` in a single transaction and return an ImportResult.
+
+    Rows are read and inserted in chunks of CHUNK_ROWS. A row is skipped and counted as a duplicate when
+    the records already stored include it, e.g. when re-importing a file or an overlapping export: the
+    file's n-th copy of a record is skipped if n identical records exist. Repeated rows (a customer's two
+    identical rackets strung the same day) are all imported the first time.
+    Rows whose date cannot be read are not imported; they are written, with the reason, to a CSV whose
+    path is returned as `error_file`.
+    `progress` is called with a percentage as chunks complete; when `is_cancelled` returns True the
+    import stops, is rolled back, and ImportCancelled is raised. A cancelled or failed import leaves no error file.
+    """
+    repository = repository or get_repository()
+    imported = duplicates = rejected = 0
+    seen = {}  # content_hash -> copies of that record in the file so far, across chunks
+    error_file = error_handle = error_writer = None
+    committed = False
+    try:
+        with repository.transaction():
+            for chunk, percent in read_chunks(file_path):
+                if is_cancelled and is_cancelled():
+                    raise ImportCancelled()
+                with timed("import: parse chunk") as timing:
+                    good, bad = prepare_chunk(chunk)
+                    timing.rows = len(chunk)
+                inserted = repository.insert_records(good.to_numpy(dtype=object).tolist(), seen)
+                imported += inserted
+                duplicates += len(good) - inserted
+                if len(bad):
+                    if error_writer is None:
+                        error_handle, error_writer = _open_error_file(file_path, bad.columns)
+                        error_file = error_handle.name
+                    error_writer.writerows(bad.to_numpy(dtype=object).tolist())
+                    rejected += len(bad)
+                if progress:
+                    progress(percent)
+        committed = True
+    finally:
+        if error_handle is not None:
+            error_handle.close()
+            if not committed:
+                os.remove(error_file)  # Nothing was imported, so there is nothing to report
+    return ImportResult(imported, duplicates, rejected, error_file)
+
+
+def read_chunks(file_path):
+    """Yield (DataFrame of strings, percent of the file read) pairs of at most CHUNK_ROWS rows."""
+    if file_path.endswith(".csv"):
+        yield from _read_csv_chunks(file_path)
+    elif file_path.endswith(".xlsx"):
+        yield from _read_xlsx_chunks(file_path)
+    else:
+        raise InvalidImportFile("Please select a valid file format (CSV or Excel).")
+
+
+def prepare_chunk(chunk):
+    """Split a chunk into rows ready for insert_records and rejected rows with an Error column."""
+    import pandas as pd
+
+    # Strip extra spaces from column names
+    chunk.columns = [str(column).strip() for column in chunk.columns]
+    missing = [column for column in REQUIRED_COLUMNS if column not in chunk.columns]
+    if missing:
+        raise InvalidImportFile("The file must contain the following columns:\n" + ", ".join(REQUIRED_COLUMNS))
+    chunk = chunk[REQUIRED_COLUMNS].fillna(MISSING_VALUE)
+
+    dates = parse_dates(chunk["Date Strung"])
+    readable = dates.notna()
+    bad = chunk[~readable].copy()
+    bad["Error"] = "Unrecognized date: " + bad["Date Strung"].astype(str)
+
+    good = pd.DataFrame({
+        "name": chunk["Name"], "racket": chunk["Racket"], "string": chunk["String"],
+        "tension": chunk["Tension"], "date_strung": dates, "date_strung_raw": None,
+        "who_strung": chunk["Who Strung"],
+    })[readable]
+    return good, bad
+
+
+def parse_dates(values):
+    """Vectorized parse_date: YYYY-MM-DD strings for every value matching DATE_FORMATS, NaN elsewhere."""
+    import pandas as pd
+
+    values = values.astype(str).str.strip()
+    parsed = pd.Series(pd.NaT, index=values.index, dtype="datetime64[ns]")
+    for date_format in DATE_FORMATS:
+        unparsed = parsed.isna()
+        if not unparsed.any():
+            break
+        parsed[unparsed] = pd.to_datetime(values[unparsed], format=date_format, errors="coerce")
+    return parsed.dt.strftime("%Y-%m-%d")
+
+
+def _read_csv_chunks(file_path):
+    import pandas as pd
+
+    size = os.path.getsize(file_path) or 1
+    with open(file_path, "rb") as handle:
+        for chunk in pd.read_csv(handle, chunksize=CHUNK_ROWS, dtype=str, skip_blank_lines=True):
+            yield chunk, min(100, handle.tell() * 100 // size)
+
+
+def _read_xlsx_chunks(file_path):
+    import pandas as pd
+    from openpyxl import load_workbook
+
+    # Read-only mode streams rows instead of loading the whole workbook
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.active
+        total = max(1, (sheet.max_row or 1) - 1)
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        done = 0
+        while True:
+            block = list(islice(rows, CHUNK_ROWS))
+            if not block:
+                break
+            done += len(block)
+            chunk = pd.DataFrame(block, columns=header, dtype=object)
+            # Match CSV imports: every cell as text, empty cells stay missing
+            yield chunk.apply(lambda column: column.map(lambda value: value if value is None else str(value))), \
+                min(100, done * 100 // total)
+    finally:
+        workbook.close()
+
+
+def _open_error_file(file_path, columns):
+    base_name = os.path.splitext(os.path.basename(file_path))[0]
+    handle = tempfile.NamedTemporaryFile("w", newline="", suffix=".csv", prefix=f"{base_name}_errors_",
+                                         delete=False, encoding="utf-8")
+    writer = csv.writer(handle)
+    writer.writerow(columns)
+    return handle, writer
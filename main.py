@@ -1,17 +1,43 @@
-from PyQt5.QtWidgets import (
-    QApplication
-)
+import startup_trace  # Imported first so startup timings start from launch
+import os
 import sys
-from backup_utils import backup_database_on_launch # used to back up the database
-from main_window import MainWindow
-from database_utils import setup_database
 
 
 if __name__ == "__main__":
-    setup_database()
-    backup_database_on_launch()  # Backup the database before launching the app
+    if "--cli" in sys.argv:
+        # Headless mode; see cli.py. Qt is never imported.
+        from cli import main
+
+        sys.argv.remove("--cli")
+        sys.exit(main())
+    if "--trace-startup" in sys.argv:
+        sys.argv.remove("--trace-startup")
+        startup_trace.enable()
+    profile = "--profile" in sys.argv or bool(os.environ.get("STRINGING_PROFILE"))
+    if "--profile" in sys.argv:
+        sys.argv.remove("--profile")
+
+    with startup_trace.span("imports"):
+        from PyQt5.QtCore import QTimer
+        from PyQt5.QtWidgets import (
+            QApplication
+        )
+        from backup_utils import start_background_backup # used to back up the database
+        from main_window import MainWindow
+        from database_utils import setup_database
+        import profiler
+
+    if profile:
+        profiler.dump_summary_on_exit()  # Per-operation timing totals, printed when the app closes
+
+    with startup_trace.span("setup_database"):
+        setup_database()
     app = QApplication(sys.argv)
     app.setStyle('Fusion')
-    window = MainWindow()
+    with startup_trace.span("MainWindow"):
+        window = MainWindow()
     window.show()
+    # Runs once the event loop has painted the window; maintenance work waits until then
+    QTimer.singleShot(0, lambda: startup_trace.mark("window painted"))
+    QTimer.singleShot(0, start_background_backup)  # Back up the database without holding up the window
     sys.exit(app.exec_())
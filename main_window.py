@@ -1,14 +1,32 @@
-import sqlite3
-
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal
 from PyQt5.QtGui import QIcon
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QPushButton, QMainWindow, QTableWidget, \
-    QHeaderView, QMessageBox, QTableWidgetItem, QFileDialog
-import sqlite3
-import pandas as pd
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QPushButton, QMainWindow, QTableView, \
+    QHeaderView, QMessageBox, QFileDialog, QMenu, QAbstractItemView, QProgressDialog, QDialog, \
+    QProgressBar, QLabel, QInputDialog
+import os
+import shutil
 from AddEditRecordDialog import AddEditRecordDialog
+from CustomerHistoryDialog import CustomerHistoryDialog
+from ExportDialog import ExportDialog
+from ExportWorker import ExportWorker
+from ImportWorker import ImportWorker
+from RecordActionsDelegate import RecordActionsDelegate
+from RecordsTableModel import RecordsTableModel, ACTIONS_COLUMN
 from ReportDialog import ReportDialog
-from datetime import datetime
+from TaskRunner import get_task_runner
+from data_access import get_repository
+from import_utils import InvalidImportFile
+import profiler
+import sync_utils
+
+SEARCH_DELAY_MS = 250  # Debounce between the last keystroke and the search query
+# Timings shown in the status bar; chunk-level import/export/backup timings only go to the profiler
+STATUS_TIMINGS = ("ui: records page", "save:", "delete", "report:", "ui: fill report table")
+
+
 class MainWindow(QMainWindow):
+    timing_recorded = pyqtSignal(str, float, object)  # label, milliseconds, rows
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Tennis Racket Stringing Information Tracker")
@@ -29,6 +47,16 @@ class MainWindow(QMainWindow):
         report_action = file_menu.addAction("Generate Report")
         report_action.triggered.connect(self.open_report_dialog)
 
+        trends_action = file_menu.addAction("Trend Charts")
+        trends_action.triggered.connect(self.open_trends_dialog)
+
+        file_menu.addSeparator()
+        sync_export_action = file_menu.addAction("Export Changes for Another Station")
+        sync_export_action.triggered.connect(self.export_changes)
+
+        sync_apply_action = file_menu.addAction("Apply Changes from Another Station")
+        sync_apply_action.triggered.connect(self.apply_changes)
+
         # Main layout
         self.central_widget = QWidget()
         self.setCentralWidget(self.central_widget)
@@ -37,8 +65,14 @@ class MainWindow(QMainWindow):
         # Search and Add Record layout
         search_layout = QHBoxLayout()
         self.search_input = QLineEdit()
-        self.search_input.setPlaceholderText("Search by Name")
-        self.search_input.textChanged.connect(self.load_records)
+        self.search_input.setPlaceholderText(
+            "Search by Name, Racket, String or Who Strung (tension:50-55 for a tension range)")
+        # Wait for a pause in typing instead of querying on every keystroke
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DELAY_MS)
+        self.search_timer.timeout.connect(self.load_records)
+        self.search_input.textChanged.connect(lambda _: self.search_timer.start())
         search_layout.addWidget(self.search_input)
 
         self.add_button = QPushButton("Add Record")
@@ -46,20 +80,70 @@ class MainWindow(QMainWindow):
         self.add_button.setFixedWidth(200)
         search_layout.addWidget(self.add_button)
 
+        self.history_button = QPushButton("Customer History")
+        self.history_button.clicked.connect(self.open_selected_history)
+        self.history_button.setFixedWidth(200)
+        search_layout.addWidget(self.history_button)
+
         self.layout.addLayout(search_layout)
 
-        # Table widget
-        self.table = QTableWidget()
-        self.table.setColumnCount(8)
-        self.table.setHorizontalHeaderLabels(["ID", "Name", "Racket", "String", "Tension", "Date", "Who Strung", "Actions"])
+        # Table view backed by a model that pages records in as the user scrolls
+        self.model = RecordsTableModel(self)
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
         self.layout.addWidget(self.table)
         self.table.setColumnHidden(0, True)
 
         header = self.table.horizontalHeader()
         header.setSectionResizeMode(QHeaderView.Stretch)
-
+        # Fixed row heights let the view skip measuring every row
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table.verticalHeader().setDefaultSectionSize(40)
+
+        # One delegate draws Edit/Delete for every row
+        self.actions_delegate = RecordActionsDelegate(self.table)
+        self.actions_delegate.edit_requested.connect(self.edit_row)
+        self.actions_delegate.delete_requested.connect(self.delete_row)
+        self.table.setItemDelegateForColumn(ACTIONS_COLUMN, self.actions_delegate)
+
+        self.table.doubleClicked.connect(lambda index: self.edit_row(index.row()))
+        self.table.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.table.customContextMenuRequested.connect(self.show_row_menu)
+
+        # Busy indicator shown in the status bar while database work runs in the background
+        self.busy_indicator = QProgressBar()
+        self.busy_indicator.setRange(0, 0)
+        self.busy_indicator.setMaximumWidth(150)
+        self.busy_indicator.setVisible(False)
+        self.statusBar().addPermanentWidget(self.busy_indicator)
+        get_task_runner().busy_changed.connect(self.busy_indicator.setVisible)
+        self.model.load_failed.connect(
+            lambda error: self.statusBar().showMessage(f"Failed to load records: {error}", 10000))
+
+        # Last operation's timing; profiler listeners run on worker threads, the signal queues to this one
+        self.timing_label = QLabel()
+        self.statusBar().addPermanentWidget(self.timing_label)
+        self.timing_recorded.connect(self.show_timing)
+        self._timing_listener = self.timing_recorded.emit
+        profiler.add_listener(self._timing_listener)
+
+        # Only queues the first page; the startup trace marks its arrival (see RecordsTableModel)
         self.load_records()
 
+    def show_timing(self, label, milliseconds, rows):
+        if label.startswith(STATUS_TIMINGS):
+            text = f"{label}: {milliseconds:.0f} ms"
+            if rows is not None:
+                text += f" ({rows} rows)"
+            self.timing_label.setText(text)
+
+    def closeEvent(self, event):
+        profiler.remove_listener(self._timing_listener)
+        super().closeEvent(event)
+
     def open_add_record(self):
         dialog = AddEditRecordDialog(self)
         dialog.exec_()
@@ -68,98 +152,87 @@ class MainWindow(QMainWindow):
         dialog = AddEditRecordDialog(self, record)
         dialog.exec_()
 
+    def edit_row(self, row):
+        self.open_edit_record(self.model.record(row))
+
+    def delete_row(self, row):
+        self.delete_record(self.model.record(row)['id'])
+
+    def history_row(self, row):
+        CustomerHistoryDialog(self, self.model.record(row)['name']).exec_()
+
+    def open_selected_history(self):
+        rows = self.table.selectionModel().selectedRows()
+        if not rows:
+            QMessageBox.information(self, "Customer History", "Select one of the customer's records first.")
+            return
+        self.history_row(rows[0].row())
+
+    def show_row_menu(self, pos):
+        index = self.table.indexAt(pos)
+        if not index.isValid():
+            return
+        menu = QMenu(self)
+        edit_action = menu.addAction("Edit")
+        delete_action = menu.addAction("Delete")
+        history_action = menu.addAction("Customer History")
+        chosen = menu.exec_(self.table.viewport().mapToGlobal(pos))
+        if chosen == edit_action:
+            self.edit_row(index.row())
+        elif chosen == delete_action:
+            self.delete_row(index.row())
+        elif chosen == history_action:
+            self.history_row(index.row())
+
     def delete_record(self, record_id):
         confirm = QMessageBox.question(self, "Confirm Deletion", "Are you sure you want to delete this record?",
                                        QMessageBox.Yes | QMessageBox.No)
         if confirm == QMessageBox.No:
             return
-        conn = sqlite3.connect("stringing.db")
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM StringingRecords WHERE id = ?", (record_id,))
-        conn.commit()
-        conn.close()
-        self.load_records()
+        get_task_runner().submit(f"delete-{record_id}", get_repository().delete_record, record_id,
+                                 on_done=lambda _: self.model.remove_record(record_id),
+                                 on_error=lambda error: QMessageBox.critical(self, "Error",
+                                                                             f"Failed to delete record: {error}"))
 
     def load_records(self):
-        conn = sqlite3.connect("stringing.db")
-        cursor = conn.cursor()
-        search_query = self.search_input.text()
-        query = """
-        SELECT id, name, racket, string, tension, date_strung, who_strung
-        FROM StringingRecords
-        """
-        if search_query:
-            query += " WHERE name LIKE ?"
-            params = (f"%{search_query}%",)
-        else:
-            params = ()
-        query += " ORDER BY date(date_strung) DESC"  # Sort by date_strung in descending order
-        cursor.execute(query, params)
-        records = cursor.fetchall()
-        self.table.setRowCount(len(records))
-        for row_index, row_data in enumerate(records):
-            for col_index, col_data in enumerate(row_data):
-                # Convert date column from YYYY-MM-DD to MM/DD/YYYY
-                if col_index == 5:  # date_strung column index
-                    try:
-                        col_data = datetime.strptime(col_data, "%Y-%m-%d").strftime("%m/%d/%Y")
-                    except ValueError:
-                        pass
-                if col_index < 7:
-                    self.table.setItem(row_index, col_index, QTableWidgetItem(str(col_data)))
-
-            # Add buttons for Edit and Delete
-            actions_layout = QHBoxLayout()
-            actions_layout.setContentsMargins(5, 5, 5, 5)  # Add padding around buttons
-            actions_layout.setSpacing(10)  # Add space between buttons
-
-            edit_button = QPushButton("Edit")
-            edit_button.setMinimumWidth(50)  # Set minimum width for the button
-            edit_button.clicked.connect(lambda _, r=row_data: self.open_edit_record({
-                'id': r[0], 'name': r[1], 'racket': r[2], 'string': r[3], 'tension': r[4], 'date_strung': r[5],
-                'who_strung': r[6]
-            }))
-            actions_layout.addWidget(edit_button)
-
-            delete_button = QPushButton("Delete")
-            delete_button.setMinimumWidth(50)  # Set minimum width for the button
-            delete_button.clicked.connect(lambda _, record_id=row_data[0]: self.delete_record(record_id))
-            actions_layout.addWidget(delete_button)
-
-            widget = QWidget()
-            widget.setLayout(actions_layout)
-            self.table.setCellWidget(row_index, 7, widget)
-        conn.close()
+        self.search_timer.stop()  # A pending search is covered by this reload
+        self.model.refresh(self.search_input.text())
 
     def export_records(self):
+        export_dialog = ExportDialog(self, self.search_input.text())
+        if export_dialog.exec_() != QDialog.Accepted:
+            return
+        search, start_date, end_date = export_dialog.export_filter()
+
         options = QFileDialog.Options()
         file_path, _ = QFileDialog.getSaveFileName(self, "Export Records", "",
                                                    "CSV Files (*.csv);;Excel Files (*.xlsx)", options=options)
         if not file_path:
             return
-        conn = sqlite3.connect("stringing.db")
-        query = """
-        SELECT name, racket, string, tension, date_strung, who_strung
-        FROM StringingRecords
-        """
-        try:
-            data = pd.read_sql_query(query, conn)
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to fetch data: {e}")
-            conn.close()
+        if not file_path.endswith((".csv", ".xlsx")):
+            QMessageBox.warning(self, "Invalid Format", "Please select a valid file format (CSV or Excel).")
             return
-        conn.close()
-        try:
-            if file_path.endswith(".csv"):
-                data.to_csv(file_path, index=False)
-            elif file_path.endswith(".xlsx"):
-                data.to_excel(file_path, index=False, engine="openpyxl")
-            else:
-                QMessageBox.warning(self, "Invalid Format", "Please select a valid file format (CSV or Excel).")
-                return
-            QMessageBox.information(self, "Success", f"Records exported successfully to {file_path}!")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to export records: {e}")
+
+        # Export in the background, streaming rows straight from the database to the file
+        self.export_progress = QProgressDialog("Exporting records...", "Cancel", 0, 100, self)
+        self.export_progress.setWindowTitle("Export Records")
+        self.export_progress.setWindowModality(Qt.WindowModal)
+        self.export_progress.setMinimumDuration(0)
+        self.export_progress.setAutoClose(False)
+        self.export_progress.setAutoReset(False)
+
+        self.export_worker = ExportWorker(file_path, search, start_date, end_date, self)
+        self.export_worker.progress.connect(self.export_progress.setValue)
+        self.export_worker.finished_export.connect(
+            lambda written: QMessageBox.information(self, "Success",
+                                                    f"{written} records exported successfully to {file_path}!"))
+        self.export_worker.failed.connect(
+            lambda error: QMessageBox.critical(self, "Error", f"Failed to export records: {error}"))
+        self.export_worker.finished.connect(self.export_progress.close)
+        self.export_progress.canceled.connect(self.export_worker.requestInterruption)
+        self.export_worker.started.connect(get_task_runner().begin_busy)
+        self.export_worker.finished.connect(get_task_runner().end_busy)
+        self.export_worker.start()
 
     def import_records(self):
         options = QFileDialog.Options()
@@ -167,60 +240,101 @@ class MainWindow(QMainWindow):
                                                    "Excel Files (*.xlsx);;CSV Files (*.csv)", options=options)
         if not file_path:
             return
+        if not file_path.endswith((".csv", ".xlsx")):
+            QMessageBox.warning(self, "Invalid Format", "Please select a valid file format (CSV or Excel).")
+            return
 
-        try:
-            # Read the file into a DataFrame
-            if file_path.endswith(".csv"):
-                data = pd.read_csv(file_path)
-            elif file_path.endswith(".xlsx"):
-                data = pd.read_excel(file_path, engine="openpyxl")
-            else:
-                QMessageBox.warning(self, "Invalid Format", "Please select a valid file format (CSV or Excel).")
-                return
-
-            # Strip extra spaces from column names
-            data.columns = data.columns.str.strip()
-
-            # Validate and ensure the file has the required columns
-            required_columns = ["Name", "Racket", "String", "Tension", "Date Strung", "Who Strung"]
-            if not all(col in data.columns for col in required_columns):
-                QMessageBox.critical(self, "Invalid File",
-                                     "The file must contain the following columns:\n" + ", ".join(required_columns))
-                return
-
-            # Replace missing values with "-no data-"
-            data.fillna("-no data-", inplace=True)
-
-            conn = sqlite3.connect("stringing.db")
-            cursor = conn.cursor()
-
-            # Ensure all date entries are strings
-            data["Date Strung"] = data["Date Strung"].astype(str)
-
-            for _, row in data.iterrows():
+        # Import in the background; the progress dialog's Cancel rolls the whole import back
+        self.import_progress = QProgressDialog("Importing records...", "Cancel", 0, 100, self)
+        self.import_progress.setWindowTitle("Import Records")
+        self.import_progress.setWindowModality(Qt.WindowModal)
+        self.import_progress.setMinimumDuration(0)
+        self.import_progress.setAutoClose(False)
+        self.import_progress.setAutoReset(False)
+
+        self.import_worker = ImportWorker(file_path, self)
+        self.import_worker.progress.connect(self.import_progress.setValue)
+        self.import_worker.finished_import.connect(self.import_finished)
+        self.import_worker.cancelled.connect(self.import_cancelled)
+        self.import_worker.failed.connect(self.import_failed)
+        self.import_worker.finished.connect(self.import_progress.close)
+        self.import_progress.canceled.connect(self.import_worker.requestInterruption)
+        self.import_worker.started.connect(get_task_runner().begin_busy)
+        self.import_worker.finished.connect(get_task_runner().end_busy)
+        self.import_worker.start()
+
+    def import_finished(self, result):
+        self.load_records()
+        skipped = ""
+        if result.duplicates:
+            skipped = f"\n{result.duplicates} rows were skipped because the same record was already stored."
+        if not result.rejected:
+            QMessageBox.information(self, "Success", f"{result.imported} records imported successfully!{skipped}")
+            return
+        answer = QMessageBox.warning(self, "Import Finished",
+                                     f"{result.imported} records imported.{skipped}\n{result.rejected} rows were "
+                                     "rejected because their date could not be read.\n\nSave the rejected rows "
+                                     "to a file?",
+                                     QMessageBox.Save | QMessageBox.Discard)
+        if answer == QMessageBox.Save:
+            file_path, _ = QFileDialog.getSaveFileName(self, "Save Rejected Rows", "import_errors.csv",
+                                                       "CSV Files (*.csv)")
+            if file_path:
                 try:
-                    # Convert date format from YYYY-MM-DD to MM/DD/YYYY if applicable
-                    try:
-                        date_strung = datetime.strptime(row["Date Strung"], "%Y-%m-%d %H:%M:%S").strftime("%Y-%m-%d")
-                    except ValueError:
-                        # Fallback if the date format doesn't match
-                        date_strung = row["Date Strung"]
-
-                    cursor.execute("""
-                        INSERT INTO StringingRecords (name, racket, string, tension, date_strung, who_strung)
-                        VALUES (?, ?, ?, ?, ?, ?)
-                    """, (row["Name"], row["Racket"], row["String"], row["Tension"], date_strung, row["Who Strung"]))
+                    shutil.move(result.error_file, file_path)
+                    return
                 except Exception as e:
-                    QMessageBox.warning(self, "Data Error", f"Failed to import record: {row}\nError: {e}")
+                    QMessageBox.critical(self, "Error", f"Failed to save rejected rows: {e}")
+        os.remove(result.error_file)
+
+    def import_cancelled(self):
+        QMessageBox.information(self, "Import Cancelled", "The import was cancelled. No records were added.")
 
-            conn.commit()
-            conn.close()
+    def import_failed(self, error):
+        if isinstance(error, InvalidImportFile):
+            QMessageBox.critical(self, "Invalid File", str(error))
+        else:
+            QMessageBox.critical(self, "Error", f"Failed to import records: {error}")
 
-            QMessageBox.information(self, "Success", "Records imported successfully!")
-            self.load_records()
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to import records: {e}")
+    def export_changes(self):
+        peer, ok = QInputDialog.getText(self, "Export Changes", "Station the changes are for (only what it "
+                                        "hasn't been sent yet; leave empty for everything):")
+        if not ok:
+            return
+        file_path, _ = QFileDialog.getSaveFileName(self, "Export Changes", "changes.delta",
+                                                   "Delta Files (*.delta)")
+        if not file_path:
+            return
+        get_task_runner().submit("sync-export", sync_utils.export_delta, file_path, peer.strip() or None,
+                                 on_done=lambda summary: QMessageBox.information(
+                                     self, "Export Changes", f"{summary.records} changed and {summary.tombstones} "
+                                     f"deleted records exported."),
+                                 on_error=lambda error: QMessageBox.critical(self, "Error",
+                                                                             f"Failed to export changes: {error}"))
+
+    def apply_changes(self):
+        file_path, _ = QFileDialog.getOpenFileName(self, "Apply Changes", "", "Delta Files (*.delta)")
+        if not file_path:
+            return
+        get_task_runner().submit("sync-apply", sync_utils.apply_delta, file_path, on_done=self.changes_applied,
+                                 on_error=lambda error: QMessageBox.critical(self, "Error",
+                                                                             f"Failed to apply changes: {error}"))
+
+    def changes_applied(self, result):
+        self.load_records()
+        message = (f"{result.inserted} records added, {result.updated} updated and {result.deleted} deleted.\n"
+                   f"{result.unchanged} were already up to date.")
+        if result.conflicts:
+            message += (f"\n\n{result.conflicts} records were changed at both stations; "
+                        "the most recent change was kept.")
+        QMessageBox.information(self, "Apply Changes", message)
 
     def open_report_dialog(self):
         dialog = ReportDialog(self)
         dialog.exec_()
+
+    def open_trends_dialog(self):
+        from TrendsDialog import TrendsDialog  # Loads NumPy; kept out of startup
+
+        dialog = TrendsDialog(self)
+        dialog.exec_()
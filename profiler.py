@@ -0,0 +1,143 @@
+# Timing of SQL statements and UI work, with a rotating log of slow operations
+#
+# Every repository query and the main Qt-side refreshes run inside timed(). Anything slower than
+# SLOW_OPERATION_MS is written, with its SQL, row count and EXPLAIN QUERY PLAN, to
+# logs/slow_operations.log next to the database. Totals per operation are kept for summary().
+import atexit
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+
+SLOW_OPERATION_MS = float(os.environ.get("STRINGING_SLOW_MS", 100))
+LOG_DIR_NAME = "logs"  # Created next to the database
+LOG_FILE_NAME = "slow_operations.log"
+LOG_MAX_BYTES = 1024 * 1024
+LOG_BACKUPS = 3
+
+_lock = threading.Lock()
+_stats = {}  # label -> [count, total ms, max ms, rows]
+_listeners = []
+_logger = None
+
+
+class Timing:
+    """Handed to the body of timed(); set `rows` to record how many rows the operation produced."""
+
+    def __init__(self, label):
+        self.label = label
+        self.rows = None
+        self.milliseconds = None
+
+
+@contextmanager
+def timed(label, sql=None, params=(), connection=None):
+    """Time the enclosed block under `label`. Give `sql` and `connection` to log its plan if it is slow."""
+    timing = Timing(label)
+    begin = time.perf_counter()
+    try:
+        yield timing
+    finally:
+        timing.milliseconds = (time.perf_counter() - begin) * 1000
+        _record(timing, sql, params, connection)
+
+
+def record(label, milliseconds, rows=None):
+    """Record an operation timed elsewhere, e.g. one that starts and finishes in different callbacks."""
+    timing = Timing(label)
+    timing.milliseconds = milliseconds
+    timing.rows = rows
+    _record(timing, None, (), None)
+
+
+def add_listener(callback):
+    """Call `callback(label, milliseconds, rows)` after every timed operation, from the thread that ran it."""
+    _listeners.append(callback)
+
+
+def remove_listener(callback):
+    if callback in _listeners:
+        _listeners.remove(callback)
+
+
+def summary():
+    """Return one line per operation (count, total, mean, max, rows), slowest total first."""
+    with _lock:
+        items = sorted(_stats.items(), key=lambda item: item[1][1], reverse=True)
+    lines = [f"{'operation':<40} {'count':>7} {'total ms':>10} {'mean ms':>9} {'max ms':>9} {'rows':>9}"]
+    for label, (count, total, maximum, rows) in items:
+        lines.append(f"{label:<40} {count:>7} {total:>10.1f} {total / count:>9.1f} {maximum:>9.1f} {rows:>9}")
+    return lines
+
+
+def dump_summary_on_exit():
+    """Print summary() to stderr and the slow-operation log when the app exits."""
+    def dump():
+        lines = summary()
+        print("\n".join(lines), file=sys.stderr)
+        _get_logger().info("Session summary\n" + "\n".join(lines))
+
+    atexit.register(dump)
+
+
+def _record(timing, sql, params, connection):
+    rows = timing.rows or 0
+    with _lock:
+        stats = _stats.setdefault(timing.label, [0, 0.0, 0.0, 0])
+        stats[0] += 1
+        stats[1] += timing.milliseconds
+        stats[2] = max(stats[2], timing.milliseconds)
+        stats[3] += rows
+    for listener in list(_listeners):
+        try:
+            listener(timing.label, timing.milliseconds, timing.rows)
+        except Exception as e:
+            print(f"Timing listener failed: {e}")
+    if timing.milliseconds >= SLOW_OPERATION_MS:
+        _log_slow(timing, sql, params, connection)
+
+
+def _log_slow(timing, sql, params, connection):
+    message = f"SLOW {timing.milliseconds:.1f} ms  {timing.label}"
+    if timing.rows is not None:
+        message += f"  rows={timing.rows}"
+    if sql:
+        message += "\n  SQL: " + " ".join(sql.split())
+        if params:
+            message += f"\n  params: {str(params)[:200]}"
+        if connection is not None:
+            message += "\n  plan:" + "".join(f"\n    {line}" for line in _query_plan(connection, sql, params))
+    try:
+        _get_logger().warning(message)
+    except Exception as e:
+        print(f"Failed to write slow operation log: {e}")
+
+
+def _query_plan(connection, sql, params):
+    try:
+        rows = connection.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+    except Exception as e:
+        return [f"(unavailable: {e})"]
+    return [row[-1] for row in rows]
+
+
+def _get_logger():
+    global _logger
+    with _lock:
+        if _logger is None:
+            from database_utils import DATABASE_PATH
+
+            log_dir = os.path.join(os.path.dirname(DATABASE_PATH), LOG_DIR_NAME)
+            os.makedirs(log_dir, exist_ok=True)
+            handler = RotatingFileHandler(os.path.join(log_dir, LOG_FILE_NAME), maxBytes=LOG_MAX_BYTES,
+                                          backupCount=LOG_BACKUPS, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            logger = logging.getLogger("stringing.slow_operations")
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            logger.addHandler(handler)
+            _logger = logger
+        return _logger
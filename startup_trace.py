@@ -0,0 +1,42 @@
+# Opt-in timing of application startup, enabled with --trace-startup or STRINGING_TRACE_STARTUP=1
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+_process_start = time.perf_counter()  # This module is imported first, so this is roughly launch time
+_enabled = bool(os.environ.get("STRINGING_TRACE_STARTUP"))
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def is_enabled():
+    return _enabled
+
+
+@contextmanager
+def span(label):
+    """Time the enclosed block and report it, when tracing is enabled."""
+    if not _enabled:
+        yield
+        return
+    begin = time.perf_counter()
+    try:
+        yield
+    finally:
+        _report(label, time.perf_counter() - begin)
+
+
+def mark(label):
+    """Report how long after launch `label` happened, when tracing is enabled."""
+    if _enabled:
+        _report(label, None)
+
+
+def _report(label, duration):
+    since_launch = (time.perf_counter() - _process_start) * 1000
+    took = f"{duration * 1000:8.1f} ms" if duration is not None else " " * 11
+    print(f"[startup] {took}  (at {since_launch:8.1f} ms)  {label}", file=sys.stderr, flush=True)
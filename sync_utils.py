@@ -0,0 +1,98 @@
+# Delta files for merging the records of several stations (each with its own stringing.db)
+#
+# A delta holds the records changed and deleted since a change sequence number, one JSON array per line
+# in a gzip file. Exporting for a named peer remembers how far that peer has been sent, so the next
+# delta only carries what changed since. Applying a delta is idempotent: records are matched by uuid
+# and the newer copy (higher version, then later updated_at, then greater content) wins, with deletions
+# kept as tombstones.
+import gzip
+import json
+import os
+import tempfile
+from collections import namedtuple
+
+from data_access import get_repository, SYNC_COLUMNS
+from database_utils import utc_timestamp
+
+DELTA_FORMAT = "stringing-delta"
+DELTA_VERSION = 1
+CHUNK_ROWS = 5000  # Rows pulled from the cursor per write
+
+DeltaSummary = namedtuple("DeltaSummary", ["records", "tombstones", "since", "until"])
+ApplyResult = namedtuple("ApplyResult", ["inserted", "updated", "deleted", "unchanged", "kept", "conflicts"])
+
+
+class InvalidDeltaFile(Exception):
+    """The file is not a delta this version can read."""
+
+
+def export_delta(file_path, peer=None, since=None, repository=None):
+    """Write the changes after `since` (default: those not yet sent to `peer`, else all) and return a DeltaSummary.
+
+    The file is written under a temporary name and renamed into place once complete; only then is
+    `peer` marked as having been sent everything up to the summary's `until`.
+    """
+    repository = repository or get_repository()
+    if since is None:
+        since = repository.peer_seq(peer) if peer else 0
+    directory = os.path.dirname(os.path.abspath(file_path))
+    handle, temp_path = tempfile.mkstemp(suffix=".delta.tmp", dir=directory)
+    os.close(handle)
+    records = tombstones = 0
+    try:
+        with repository.snapshot(), gzip.open(temp_path, "wt", encoding="utf-8") as file:
+            until, station = repository.sync_state()
+            _write_line(file, {"format": DELTA_FORMAT, "version": DELTA_VERSION, "station": station, "since": since,
+                               "until": until, "created_at": utc_timestamp(), "columns": SYNC_COLUMNS})
+            for kind, cursor in [("r", repository.changed_records(since)), ("t", repository.tombstones(since))]:
+                while True:
+                    rows = cursor.fetchmany(CHUNK_ROWS)
+                    if not rows:
+                        break
+                    for row in rows:
+                        _write_line(file, [kind, *row])
+                    if kind == "r":
+                        records += len(rows)
+                    else:
+                        tombstones += len(rows)
+        os.replace(temp_path, file_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    if peer:
+        repository.set_peer_seq(peer, until)
+    return DeltaSummary(records, tombstones, since, until)
+
+
+def apply_delta(file_path, repository=None):
+    """Merge a delta into the database in one transaction and return an ApplyResult of counts."""
+    repository = repository or get_repository()
+    counts = dict.fromkeys(ApplyResult._fields, 0)
+    try:
+        with gzip.open(file_path, "rt", encoding="utf-8") as file:
+            header = json.loads(file.readline() or "null")
+            if not isinstance(header, dict) or header.get("format") != DELTA_FORMAT:
+                raise InvalidDeltaFile("This is not a stringing delta file.")
+            if header.get("version") != DELTA_VERSION:
+                raise InvalidDeltaFile(f"Unsupported delta version {header.get('version')}.")
+            columns = header["columns"]
+            with repository.transaction():
+                for line in file:
+                    kind, *values = json.loads(line)
+                    if kind == "r":
+                        outcome, conflict = repository.apply_record(dict(zip(columns, values)))
+                    elif kind == "t":
+                        outcome, conflict = repository.apply_tombstone(*values)
+                    else:
+                        raise InvalidDeltaFile(f"Unknown entry {kind!r} in delta file.")
+                    # A tombstone for a record never seen here changes nothing visible
+                    counts["unchanged" if outcome == "recorded" else outcome] += 1
+                    counts["conflicts"] += conflict
+    except (OSError, EOFError, ValueError, KeyError) as e:
+        raise InvalidDeltaFile(f"Could not read delta file: {e}") from e
+    return ApplyResult(**counts)
+
+
+def _write_line(file, value):
+    file.write(json.dumps(value, separators=(",", ":"), ensure_ascii=False))
+    file.write("\n")